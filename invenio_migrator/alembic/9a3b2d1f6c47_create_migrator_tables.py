@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Create migrator tables."""
+
+from __future__ import absolute_import, print_function
+
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9a3b2d1f6c47'
+down_revision = '5e7cbaa1c0a4'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'migrator_load_ledger',
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('updated', sa.DateTime(), nullable=False),
+        sa.Column('dump', sa.String(length=255), nullable=False),
+        sa.Column('item_index', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('item_id', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.CHAR(length=1), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('record_id', sqlalchemy_utils.types.uuid.UUIDType(),
+                  nullable=True),
+        sa.PrimaryKeyConstraint(
+            'dump', 'item_index', name=op.f('pk_migrator_load_ledger')),
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('migrator_load_ledger')
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Cache of MARCXML to JSON conversions.
+
+Legacy records are often revised many times while only a few fields change,
+and consecutive revisions frequently differ only by their ``005`` control
+field (date and time of the latest transaction). The conversion cache is
+addressed by the content of the MARCXML without the ``005`` value, so that
+such revisions are converted only once. The ``005`` field itself is converted
+for each revision, which keeps the result identical to a full conversion.
+
+Conversions are returned with JSON types (e.g. lists instead of the tuples
+created by DoJSON), as they are stored, whether they come from the cache or
+not (see :func:`to_json`).
+"""
+
+from __future__ import absolute_import, print_function
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import OrderedDict
+
+from dojson.contrib.marc21.utils import create_record
+
+_CONTROLFIELD_005 = re.compile(
+    r'(<controlfield\s+tag=["\']005["\']\s*>)([^<]*)(</controlfield>)')
+
+
+def to_json(data):
+    """Get the JSON form of a converted record, as read back from the cache.
+
+    :param data: Converted record.
+    :returns: The record with JSON types only.
+    """
+    return json.loads(json.dumps(data))
+
+
+def transaction_date_key(model):
+    """Get the key in which a DoJSON model stores the ``005`` field.
+
+    :param model: DoJSON model.
+    :returns: Name of the key, or ``None`` if the model has no rule for it.
+    """
+    if model.index is None:
+        model.build()
+    rule = model.index.query('005')
+    return rule[0] if rule else None
+
+
+def _model_id(model):
+    """Get an identifier of a DoJSON model which is stable across processes.
+
+    :param model: DoJSON model (``dojson.overdo.Overdo``).
+    :returns: Hash of the rules of the model.
+    """
+    if model.index is None:
+        model.build()
+    rules = u'\n'.join(
+        u'{0} {1} {2}.{3}'.format(
+            field, name, creator.__module__, creator.__name__)
+        for field, (name, creator) in model.rules
+    )
+    return hashlib.sha1(rules.encode('utf-8')).hexdigest()
+
+
+class ConversionCache(object):
+    """Bounded cache of MARCXML to JSON conversions.
+
+    The most recently used conversions are kept in memory, up to ``maxsize``
+    entries. If a ``directory`` is given, conversions are also stored on disk,
+    so that they survive worker restarts and can be shared between workers.
+    """
+
+    def __init__(self, maxsize=1000, directory=None):
+        """Initialize cache.
+
+        :param maxsize: Number of conversions kept in memory.
+        :param directory: Directory in which conversions are stored on disk.
+        """
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._model_ids = {}
+
+    def key(self, marcxml, model):
+        """Get the cache key of a MARCXML record.
+
+        :param marcxml: MARCXML record.
+        :param model: DoJSON model used for the conversion.
+        :returns: Hash of the MARCXML without ``005`` value and of the model.
+        """
+        if id(model) not in self._model_ids:
+            self._model_ids[id(model)] = _model_id(model)
+        normalized = _CONTROLFIELD_005.sub(r'\1\3', marcxml)
+        digest = hashlib.sha1(self._model_ids[id(model)].encode('utf-8'))
+        digest.update(normalized.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        """Get the path of a conversion stored on disk."""
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        """Get a cached conversion.
+
+        :param key: Cache key.
+        :returns: Serialized conversion or ``None``.
+        """
+        value = self._entries.pop(key, None)
+        if value is None and self.directory:
+            try:
+                with open(self._path(key), 'rb') as fp:
+                    value = fp.read().decode('utf-8')
+            except IOError:
+                pass
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    def set(self, key, value):
+        """Cache a conversion.
+
+        :param key: Cache key.
+        :param value: Serialized conversion.
+        """
+        self._store(key, value)
+        if self.directory:
+            path = self._path(key)
+            dirname = os.path.dirname(path)
+            if not os.path.isdir(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    # Created in the meantime by another worker.
+                    pass
+            fd, tmp = tempfile.mkstemp(dir=dirname)
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(value.encode('utf-8'))
+            os.rename(tmp, path)
+
+    def _store(self, key, value):
+        """Store a conversion in memory, evicting the least recently used."""
+        self._entries[key] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def convert(self, marcxml, model):
+        """Convert a MARCXML record with a DoJSON model.
+
+        :param marcxml: MARCXML record.
+        :param model: DoJSON model.
+        :returns: Converted record, with JSON types (see :func:`to_json`).
+        """
+        key = self.key(marcxml, model)
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+            value = json.dumps(model.do(create_record(marcxml)))
+            self.set(key, value)
+            return json.loads(value)
+
+        self.hits += 1
+        data = json.loads(value)
+        match = _CONTROLFIELD_005.search(marcxml)
+        if match:
+            data.update(to_json(model.do({'005': match.group(2)})))
+        else:
+            # Do not keep a 005 of the cached conversion.
+            name = transaction_date_key(model)
+            if name in data:
+                del data[name]
+                if name in data.get('__order__', []):
+                    data['__order__'].remove(name)
+        return data
@@ -27,13 +27,23 @@
 from __future__ import absolute_import, print_function
 
 import json
+import os
+from itertools import islice
+from multiprocessing import Pool
 
 import click
 from celery import chain
+from flask import current_app
 from flask.cli import with_appcontext
+from invenio_db import db
+from invenio_records.models import RecordMetadata
 
+from .dispatch import DispatchWindow
+from .models import LoadLedger, LoadStatus
 from .proxies import current_migrator
-from .tasks.records import import_record
+from .reader import ITEM_IDS, MappedDump, dump_ref, dump_size, find_item, \
+    iter_dump, iter_dump_items, write_index
+from .tasks.records import import_record, import_records, validate_records
 
 
 @click.group()
@@ -41,57 +51,390 @@ def dumps():
     """Migration commands."""
 
 
-def _loadrecord(record_dump, source_type, eager=False):
+def _reference_option(f):
+    """Add the option to send references to the dump items to a command."""
+    return click.option(
+        '--by-reference', is_flag=True,
+        help='Send references to the items in the dump files instead of the '
+        'items. The workers must be able to read the dump files at the same '
+        'path.')(f)
+
+
+def _ledger_options(f):
+    """Add the load ledger options to a command."""
+    f = click.option('--resume', is_flag=True,
+                     help='Skip the items already loaded according to the '
+                     'load ledger (implies --ledger).')(f)
+    return click.option('--ledger', is_flag=True,
+                        help='Record the status of each item in the load '
+                        'ledger.')(f)
+
+
+def _dispatch_options(f):
+    """Add the dispatch options to a command."""
+    return click.option(
+        '--max-in-flight', '-w', type=click.IntRange(min=0), default=None,
+        help='Maximum number of tasks dispatched but not completed yet '
+        '(0 for no limit). Default: MIGRATOR_MAX_IN_FLIGHT.')(f)
+
+
+def _dispatch_window(max_in_flight):
+    """Create the dispatch window of a command."""
+    if max_in_flight is None:
+        max_in_flight = current_app.config['MIGRATOR_MAX_IN_FLIGHT']
+    return DispatchWindow(size=max_in_flight)
+
+
+def _loadrecord(record_dump, source_type, eager=False, ledger=None):
     """Load a single record into the database.
 
     :param record_dump: Record dump.
     :type record_dump: dict
     :param source_type: 'json' or 'marcxml'
     :param eager: If ``True`` execute the task synchronously.
+    :param ledger: Load ledger entry of the record.
+    :returns: Result of the dispatched task, or ``None`` if it was executed
+        synchronously.
     """
+    kwargs = dict(source_type=source_type)
+    if ledger:
+        kwargs['ledger'] = ledger
     if eager:
-        import_record.s(record_dump, source_type=source_type).apply(throw=True)
+        import_record.s(record_dump, **kwargs).apply(throw=True)
     elif current_migrator.records_post_task:
-        chain(
-            import_record.s(record_dump, source_type=source_type),
+        return chain(
+            import_record.s(record_dump, **kwargs),
             current_migrator.records_post_task.s()
         )()
     else:
-        import_record.delay(record_dump, source_type=source_type)
+        return import_record.delay(record_dump, **kwargs)
+
+
+def _loadrecords(record_dumps, source_type, ledger=None):
+    """Load a batch of records into the database with a single task.
+
+    The records of the batch are post-processed together by the task (see
+    ``MIGRATOR_RECORDS_BULK_POST_TASK``), the per-record post task is not
+    chained to it.
+
+    :param record_dumps: Record dumps.
+    :type record_dumps: list of dict
+    :param source_type: 'json' or 'marcxml'
+    :param ledger: Load ledger entries of the records.
+    :type ledger: list of dict
+    :returns: Result of the dispatched task.
+    """
+    kwargs = dict(source_type=source_type)
+    if ledger:
+        kwargs['ledger'] = ledger
+    return import_records.delay(record_dumps, **kwargs)
+
+
+def _iter_source(source):
+    """Iterate over the items of a dump file, reporting progress in bytes.
+
+    :param source: Dump file opened in binary mode.
+    :returns: Iterator of ``(offset, length, item)`` tuples (see
+        :func:`invenio_migrator.reader.iter_dump`).
+    """
+    pos = 0
+    with click.progressbar(length=dump_size(source)) as bar:
+        for offset, length, item in iter_dump(source):
+            yield offset, length, item
+            bar.update(offset + length - pos)
+            pos = offset + length
+
+
+_LEDGER_COMMIT_SIZE = 100
+"""Number of items marked as dispatched in the load ledger per commit."""
+
+
+def _iter_ledger(source, item_id, ledger=False, resume=False,
+                 by_reference=False):
+    """Iterate over the items of a dump file, tracking them in the load ledger.
+
+    Each item is marked as dispatched in the ledger before it is returned; the
+    load task then marks it as succeeded or failed. The dispatched items are
+    committed in groups of ``_LEDGER_COMMIT_SIZE``.
+
+    :param source: Dump file opened in binary mode.
+    :param item_id: Function returning the identifier of an item.
+    :param ledger: If ``True`` record the items in the load ledger.
+    :param resume: If ``True`` skip the items which have already been loaded
+        according to the ledger (implies ``ledger``).
+    :param by_reference: If ``True`` return references to the items in the
+        dump file (see :func:`invenio_migrator.reader.dump_ref`) instead of
+        the items.
+    :returns: Iterator of ``(item, entry)`` tuples, where ``entry`` is the load
+        ledger entry of the item, or ``None`` if the ledger is not used.
+    """
+    dump = os.path.abspath(source.name)
+    if by_reference and not os.path.isfile(dump):
+        raise click.UsageError(
+            'Cannot send references to the items of {0}.'.format(source.name))
+    track = ledger or resume
+    if by_reference and not track:
+        # The items do not need to be decoded at all.
+        with MappedDump(dump) as mapped:
+            with click.progressbar(mapped.offsets()) as bar:
+                for offset, length in bar:
+                    yield dump_ref(dump, offset, length), None
+        return
+
+    loaded = LoadLedger.succeeded(dump) if resume else {}
+    skipped = 0
+    pending = []
+    for index, (offset, length, item) in enumerate(_iter_source(source)):
+        data = dump_ref(dump, offset, length) if by_reference else item
+        if not track:
+            yield data, None
+            continue
+        _id = item_id(item)
+        _id = None if _id is None else str(_id)
+        if index in loaded and loaded[index] == _id:
+            skipped += 1
+            continue
+        LoadLedger.mark(
+            dump, index, LoadStatus.DISPATCHED, item_id=_id, commit=False)
+        pending.append((data, dict(dump=dump, index=index, item_id=_id)))
+        if len(pending) == _LEDGER_COMMIT_SIZE:
+            db.session.commit()
+            for data, entry in pending:
+                yield data, entry
+            pending = []
+    # The items must be committed as dispatched before the load tasks mark
+    # them as succeeded or failed.
+    if pending:
+        db.session.commit()
+    for data, entry in pending:
+        yield data, entry
+    if resume:
+        click.echo('Skipped {0} items already loaded.'.format(skipped))
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
 @click.option('--source-type', '-t',  type=click.Choice(['json', 'marcxml']),
               default='marcxml', help='Whether to use JSON or MARCXML.')
 @click.option('--recid', '-r',
               help='Record ID to load (NOTE: will load only one record!).',
               default=None)
+@click.option('--batch-size', '-b', type=click.IntRange(min=1), default=1,
+              help='Number of records sent to a worker in a single task.')
+@_ledger_options
+@_dispatch_options
+@_reference_option
 @with_appcontext
-def loadrecords(sources, source_type, recid):
+def loadrecords(sources, source_type, recid, batch_size, ledger, resume,
+                max_in_flight, by_reference):
     """Load records migration dump."""
-    # Load all record dumps up-front and find the specific JSON
+    # Look for the specific record in each dump (see ``invenio dumps index``)
     if recid is not None:
         for source in sources:
-            records = json.load(source)
-            for item in records:
-                if str(item['recid']) == str(recid):
-                    _loadrecord(item, source_type, eager=True)
-                    click.echo("Record '{recid}' loaded.".format(recid=recid))
-                    return
+            item = find_item(source, recid, 'recid')
+            if item is not None:
+                _loadrecord(item, source_type, eager=True)
+                click.echo("Record '{recid}' loaded.".format(recid=recid))
+                return
         click.echo("Record '{recid}' not found.".format(recid=recid))
     else:
+        if batch_size > 1 and current_migrator.records_post_task:
+            raise click.UsageError(
+                'MIGRATOR_RECORDS_POST_TASK is only run on single records, '
+                'use MIGRATOR_RECORDS_BULK_POST_TASK with --batch-size.')
+        window = _dispatch_window(max_in_flight)
         for idx, source in enumerate(sources, 1):
             click.echo('Loading dump {0} of {1} ({2})'.format(
                 idx, len(sources), source.name))
-            data = json.load(source)
-            with click.progressbar(data) as records:
-                for item in records:
-                    _loadrecord(item, source_type)
+            batch, entries = [], []
+            items = _iter_ledger(source, lambda d: d.get('recid'),
+                                 ledger=ledger, resume=resume,
+                                 by_reference=by_reference)
+            for item, entry in items:
+                if batch_size == 1:
+                    window.add(_loadrecord(item, source_type, ledger=entry))
+                    continue
+                batch.append(item)
+                if entry:
+                    entries.append(entry)
+                if len(batch) == batch_size:
+                    window.add(
+                        _loadrecords(batch, source_type, ledger=entries))
+                    batch, entries = [], []
+            if batch:
+                window.add(_loadrecords(batch, source_type, ledger=entries))
+        window.join()
+
+
+_transform_dump = None
+
+
+def _init_transform(dump_cls, conversion_cache):
+    """Initialize a record transformation worker."""
+    global _transform_dump
+    _transform_dump = (dump_cls, conversion_cache)
+
+
+def _transform_record(item):
+    """Convert the MARCXML revisions of a record dump to JSON.
+
+    :param item: Record dump.
+    :returns: Record dump with the converted revisions.
+    """
+    dump_cls, conversion_cache = _transform_dump
+    dump = dump_cls(item, conversion_cache=conversion_cache)
+    for revision in item.get('record') or []:
+        revision['json'] = dump.convert_revision(revision)
+    return item
+
+
+@dumps.command()
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@click.option('--output-dir', '-o', type=click.Path(file_okay=False),
+              required=True, help='Directory of the converted dumps.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1,
+              help='Number of processes converting records.')
+@with_appcontext
+def transformrecords(sources, output_dir, jobs):
+    """Convert MARCXML record dumps to JSON record dumps.
+
+    Each dump is written with the same file name to the output directory and
+    can be loaded with ``invenio dumps loadrecords -t json``.
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    initargs = (current_migrator.records_dump_cls,
+                current_migrator.records_conversion_cache)
+    _init_transform(*initargs)
+    pool = Pool(processes=jobs, initializer=_init_transform,
+                initargs=initargs) if jobs > 1 else None
+    try:
+        for idx, source in enumerate(sources, 1):
+            output = os.path.join(output_dir, os.path.basename(source.name))
+            if os.path.abspath(output) == os.path.abspath(source.name):
+                raise click.UsageError(
+                    'Cannot overwrite dump {0}.'.format(source.name))
+            click.echo('Converting dump {0} of {1} ({2})'.format(
+                idx, len(sources), source.name))
+            items = (item for _, _, item in _iter_source(source))
+            with open(output, 'w') as fp:
+                fp.write('[')
+                first = True
+                while True:
+                    batch = list(islice(items, jobs * 10))
+                    if not batch:
+                        break
+                    if pool:
+                        batch = pool.map(_transform_record, batch)
+                    else:
+                        batch = [_transform_record(item) for item in batch]
+                    for item in batch:
+                        if not first:
+                            fp.write(',\n')
+                        first = False
+                        fp.write(json.dumps(item))
+                fp.write(']\n')
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.Path(dir_okay=False), nargs=-1)
+@click.option('--batch-size', '-b', type=click.IntRange(min=1), default=1000,
+              help='Number of records post-processed together.')
+@click.option('--eager', '-e', is_flag=True,
+              help='Post-process the records synchronously.')
+@with_appcontext
+def postprocess(sources, batch_size, eager):
+    """Post-process the loaded records in bulk (e.g. index them).
+
+    The records loaded from the given dump files (or from all the dump files
+    if none is given) are taken from the load ledger, i.e. they must have
+    been loaded with ``--ledger``. They are sent in batches to the
+    ``MIGRATOR_RECORDS_BULK_POST_TASK``.
+
+    The records loaded with ``--batch-size`` are already post-processed by
+    their load task; this is meant for the records loaded one by one, or to
+    post-process records again.
+    """
+    task = current_migrator.records_bulk_post_task
+    if task is None:
+        raise click.UsageError('MIGRATOR_RECORDS_BULK_POST_TASK is not set.')
+
+    record_ids = LoadLedger.succeeded_records(
+        [os.path.abspath(source) for source in sources])
+    for i in range(0, len(record_ids), batch_size):
+        batch = [str(r) for r in record_ids[i:i + batch_size]]
+        if eager or not hasattr(task, 'delay'):
+            task(batch)
+        else:
+            task.delay(batch)
+    click.echo('{0} records post-processed.'.format(len(record_ids)))
+
+
+@dumps.command()
+@click.option('--batch-size', '-b', type=click.IntRange(min=1), default=500,
+              help='Number of records validated in a single task.')
+@click.option('--eager', '-e', is_flag=True,
+              help='Validate the records synchronously.')
+@with_appcontext
+def validaterecords(batch_size, eager):
+    """Validate the records against their JSON schemas.
+
+    Meant to be run after loading the records with
+    ``MIGRATOR_RECORDS_DEFER_HOOKS`` enabled. The batches of records are
+    validated in parallel by the workers, which log the invalid records.
+    With ``--eager`` the invalid records are listed instead.
+    """
+    query = RecordMetadata.query.filter(
+        RecordMetadata.json.isnot(None)
+    ).with_entities(RecordMetadata.id).order_by(RecordMetadata.id)
+
+    invalid, tasks = 0, 0
+    ids = (str(row.id) for row in query.yield_per(batch_size))
+    while True:
+        batch = list(islice(ids, batch_size))
+        if not batch:
+            break
+        tasks += 1
+        if not eager:
+            validate_records.delay(batch)
+            continue
+        for record_id, error in validate_records.s(batch).apply(
+                throw=True).result:
+            click.secho('{0}: {1}'.format(record_id, error), fg='red')
+            invalid += 1
+    if eager:
+        click.echo('{0} invalid records found.'.format(invalid))
+    else:
+        click.echo('{0} validation tasks sent.'.format(tasks))
+
+
+@dumps.command()
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@click.option('--key', '-k', type=click.Choice(sorted(ITEM_IDS)),
+              default=None, help='Identifier of the items. By default it is '
+              'guessed from the first item of each dump.')
+@with_appcontext
+def index(sources, key):
+    """Index the items of dumps by identifier.
+
+    An index file is written next to each dump file, with the byte position
+    of each item. It is used to read a single item directly, e.g. by
+    ``loadrecords --recid``, ``loaddeposit --depid`` and ``inspectrecords
+    --recid``. The index is ignored once the dump file is modified.
+    """
+    for idx, source in enumerate(sources, 1):
+        click.echo('Indexing dump {0} of {1} ({2})'.format(
+            idx, len(sources), source.name))
+        count = write_index(source, key=key)
+        click.echo('{0} items indexed.'.format(count))
+
+
+@dumps.command()
+@click.argument('sources', type=click.File('rb'), nargs=-1)
 @click.option('--recid', type=int)
 @click.option('--files', 'entity', flag_value='files')
 @click.option('--json', 'entity', flag_value='json')
@@ -102,50 +445,50 @@ def inspectrecords(sources, recid, entity=None):
     for idx, source in enumerate(sources, 1):
         click.echo('Loading dump {0} of {1} ({2})'.format(idx, len(sources),
                                                           source.name))
-        data = json.load(source)
 
         # Just print record identifiers if none are selected.
         if not recid:
             click.secho('Record identifiers', fg='green')
             total = 0
-            for r in (d['recid'] for d in data):
+            for r in (d['recid'] for d in iter_dump_items(source)):
                 click.echo(r)
                 total += 1
             click.echo('{0} records found in dump.'.format(total))
             return
 
-        data = list(filter(lambda d: d['recid'] == recid, data))
-
-        if not data:
-            click.secho("Record not found.", fg='yellow')
-            return
-
-        for record in data:
-            if entity is None:
-                click.echo(json.dumps(record, indent=2))
-            if entity == 'files':
-                click.secho('Files', fg='green')
-                click.echo(
-                    json.dumps(record['files'], indent=2))
-
-            if entity == 'json':
-                click.secho('Records (JSON)', fg='green')
-                for revision in record['record']:
-                    click.secho('Revision {0}'.format(
-                        revision['modification_datetime']), fg='yellow')
-                    click.echo(json.dumps(revision['json'], indent=2))
-
-            if entity == 'marcxml':
-                click.secho('Records (MARCXML)', fg='green')
-                for revision in record['record']:
-                    click.secho(
-                        'Revision {0}'.format(revision['marcxml']),
-                        fg='yellow')
-                    click.echo(revision)
+        record = find_item(source, recid, 'recid')
+        if record is None:
+            if idx == len(sources):
+                click.secho("Record not found.", fg='yellow')
+            continue
+
+        if entity is None:
+            click.echo(json.dumps(record, indent=2))
+        if entity == 'files':
+            click.secho('Files', fg='green')
+            click.echo(
+                json.dumps(record['files'], indent=2))
+
+        if entity == 'json':
+            click.secho('Records (JSON)', fg='green')
+            for revision in record['record']:
+                click.secho('Revision {0}'.format(
+                    revision['modification_datetime']), fg='yellow')
+                click.echo(json.dumps(revision['json'], indent=2))
+
+        if entity == 'marcxml':
+            click.secho('Records (MARCXML)', fg='green')
+            for revision in record['record']:
+                click.secho(
+                    'Revision {0}'.format(revision['marcxml']),
+                    fg='yellow')
+                click.echo(revision)
+        return
 
 
 def loadcommon(sources, load_task, asynchronous=True, predicate=None,
-               task_args=None, task_kwargs=None):
+               task_args=None, task_kwargs=None, item_id=None, ledger=False,
+               resume=False, max_in_flight=None, by_reference=False):
     """Common helper function for load simple objects.
 
     .. note::
@@ -163,8 +506,16 @@ def loadcommon(sources, load_task, asynchronous=True, predicate=None,
       (an item from the dump) and return ``True`` if the item
       should be loaded. See the ``loaddeposit`` for a concrete example.
 
-    :param sources: JSON source files with dumps
-    :type sources: list of str (filepaths)
+    .. note::
+
+      With ``ledger``, the status of each item is recorded in the load ledger
+      (see :class:`invenio_migrator.models.LoadLedger`), keyed by the dump
+      file, the position of the item in the file and its identifier. With
+      ``resume``, the items which have already been loaded are skipped, so
+      that an interrupted load can be restarted with the same dump files.
+
+    :param sources: JSON source files with dumps, opened in binary mode.
+    :type sources: list of file objects
     :param load_task: Shared task which loads the dump.
     :type load_task: function
     :param asynchronous: Flag for serial or asynchronous execution of the task.
@@ -175,70 +526,107 @@ def loadcommon(sources, load_task, asynchronous=True, predicate=None,
     :type task_args: tuple
     :param task_kwargs: named arguments passed to the task.
     :type task_kwargs: dict
+    :param item_id: Function returning the identifier of an item, which is
+        recorded in the load ledger. Default: the ``id`` of the item.
+    :type item_id: function
+    :param ledger: Record the status of each item in the load ledger.
+    :type ledger: bool
+    :param resume: Skip the items already loaded according to the load
+        ledger (implies ``ledger``).
+    :type resume: bool
+    :param max_in_flight: Maximum number of asynchronous tasks which have
+        not completed yet (see
+        :class:`invenio_migrator.dispatch.DispatchWindow`). Default:
+        ``MIGRATOR_MAX_IN_FLIGHT``.
+    :type max_in_flight: int
+    :param by_reference: Send references to the items in the dump files
+        instead of the items (see :func:`invenio_migrator.reader.dump_ref`).
+        The ``load_task`` must accept such references.
+    :type by_reference: bool
     """
     # resolve the defaults for task_args and task_kwargs
     task_args = tuple() if task_args is None else task_args
     task_kwargs = dict() if task_kwargs is None else task_kwargs
+    item_id = item_id or (lambda d: d.get('id'))
+    # the ledger is not used when loading a single item
+    ledger = ledger and predicate is None
+    resume = resume and predicate is None
+    window = _dispatch_window(max_in_flight)
     click.echo('Loading dumps started.')
     for idx, source in enumerate(sources, 1):
         click.echo('Opening dump file {0} of {1} ({2})'.format(
             idx, len(sources), source.name))
-        data = json.load(source)
-        with click.progressbar(data) as data_bar:
-            for d in data_bar:
-                # Load a single item from the dump
-                if predicate is not None:
-                    if predicate(d):
-                        load_task.s(d, *task_args, **task_kwargs).apply(
-                            throw=True)
-                        click.echo("Loaded a single record.")
-                        return
-                # Load dumps normally
+        items = _iter_ledger(source, item_id, ledger=ledger, resume=resume,
+                             by_reference=by_reference and predicate is None)
+        for d, entry in items:
+            # Load a single item from the dump
+            if predicate is not None:
+                if predicate(d):
+                    load_task.s(d, *task_args, **task_kwargs).apply(
+                        throw=True)
+                    click.echo("Loaded a single record.")
+                    return
+            # Load dumps normally
+            else:
+                kwargs = task_kwargs
+                if entry:
+                    kwargs = dict(task_kwargs, ledger=entry)
+                if asynchronous:
+                    window.add(
+                        load_task.s(d, *task_args, **kwargs).apply_async())
                 else:
-                    if asynchronous:
-                        load_task.s(d, *task_args, **task_kwargs).apply_async()
-                    else:
-                        load_task.s(d, *task_args, **task_kwargs).apply(
-                            throw=True)
+                    load_task.s(d, *task_args, **kwargs).apply(throw=True)
+    window.join()
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
 @click.argument('logos_dir', type=click.Path(exists=True), default=None)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loadcommunities(sources, logos_dir):
+def loadcommunities(sources, logos_dir, ledger, resume, max_in_flight):
     """Load communities."""
     from invenio_migrator.tasks.communities import load_community
-    loadcommon(sources, load_community, task_args=(logos_dir, ))
+    loadcommon(sources, load_community, task_args=(logos_dir, ),
+               ledger=ledger, resume=resume, max_in_flight=max_in_flight)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loadfeatured(sources):
+def loadfeatured(sources, ledger, resume, max_in_flight):
     """Load community featurings."""
     from invenio_migrator.tasks.communities import load_featured
-    loadcommon(sources, load_featured)
+    loadcommon(sources, load_featured, ledger=ledger, resume=resume,
+               max_in_flight=max_in_flight)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
 @with_appcontext
-def loadusers(sources):
+def loadusers(sources, ledger, resume):
     """Load users."""
     from .tasks.users import load_user
     # Cannot be executed asynchronously due to duplicate emails and usernames
     # which can create a racing condition.
-    loadcommon(sources, load_user, asynchronous=False)
+    loadcommon(sources, load_user, asynchronous=False, ledger=ledger,
+               resume=resume)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
 @click.option('--depid', '-d', type=int,
               help='Deposit ID to load (Note: will load only one deposit!).',
               default=None)
+@_ledger_options
+@_dispatch_options
+@_reference_option
 @with_appcontext
-def loaddeposit(sources, depid):
+def loaddeposit(sources, depid, ledger, resume, max_in_flight, by_reference):
     """Load deposit.
 
     Usage:
@@ -247,53 +635,75 @@ def loaddeposit(sources, depid):
     """
     from .tasks.deposit import load_deposit
     if depid is not None:
-        def pred(dep):
-            return int(dep["_p"]["id"]) == depid
-        loadcommon(sources, load_deposit, predicate=pred, asynchronous=False)
+        # Look for the deposit in each dump (see ``invenio dumps index``)
+        for source in sources:
+            item = find_item(source, depid, 'depid')
+            if item is not None:
+                load_deposit.s(item).apply(throw=True)
+                click.echo("Deposit '{0}' loaded.".format(depid))
+                return
+        click.echo("Deposit '{0}' not found.".format(depid))
     else:
-        loadcommon(sources, load_deposit)
+        loadcommon(sources, load_deposit, item_id=lambda d: d['_p']['id'],
+                   ledger=ledger, resume=resume, max_in_flight=max_in_flight,
+                   by_reference=by_reference)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loadremoteaccounts(sources):
+def loadremoteaccounts(sources, ledger, resume, max_in_flight):
     """Load remote accounts."""
     from .tasks.oauthclient import load_remoteaccount
-    loadcommon(sources, load_remoteaccount)
+    loadcommon(sources, load_remoteaccount, ledger=ledger, resume=resume,
+               max_in_flight=max_in_flight)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loadremotetokens(sources):
+def loadremotetokens(sources, ledger, resume, max_in_flight):
     """Load remote tokens."""
     from .tasks.oauthclient import load_remotetoken
-    loadcommon(sources, load_remotetoken)
+    loadcommon(sources, load_remotetoken, ledger=ledger, resume=resume,
+               max_in_flight=max_in_flight)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loaduserexts(sources):
+def loaduserexts(sources, ledger, resume, max_in_flight):
     """Load user identities (legacy UserEXT)."""
     from .tasks.oauthclient import load_userext
-    loadcommon(sources, load_userext)
+    loadcommon(sources, load_userext, ledger=ledger, resume=resume,
+               max_in_flight=max_in_flight)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loadtokens(sources):
+def loadtokens(sources, ledger, resume, max_in_flight):
     """Load server tokens."""
     from .tasks.oauth2server import load_token
-    loadcommon(sources, load_token)
+    loadcommon(sources, load_token, ledger=ledger, resume=resume,
+               max_in_flight=max_in_flight)
 
 
 @dumps.command()
-@click.argument('sources', type=click.File('r'), nargs=-1)
+@click.argument('sources', type=click.File('rb'), nargs=-1)
+@_ledger_options
+@_dispatch_options
 @with_appcontext
-def loadclients(sources):
+def loadclients(sources, ledger, resume, max_in_flight):
     """Load server clients."""
     from .tasks.oauth2server import load_client
-    loadcommon(sources, load_client)
+    loadcommon(sources, load_client, item_id=lambda d: d.get('client_id'),
+               ledger=ledger, resume=resume, max_in_flight=max_in_flight)
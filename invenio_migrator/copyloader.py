@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Bulk loader of record dumps for initial migrations.
+
+:class:`RecordDumpCopyLoader` can be used instead of the default
+:class:`invenio_migrator.records.RecordDumpLoader` (see
+``MIGRATOR_RECORDS_DUMPLOADER_CLS``) to load a batch of record dumps at once.
+Instead of going through the ORM for each record, revision, persistent
+identifier and file, it builds all the rows of the batch in memory and writes
+them with a single ``COPY FROM STDIN`` per table on PostgreSQL (or a single
+multi-row insert on other databases).
+
+The database ends up in the same state as with the default loader, including
+the version history of the records. However, the loader is only meant for the
+initial migration into an empty database: records are always created (never
+updated), record signals are not sent and records are not validated.
+"""
+
+from __future__ import absolute_import, print_function
+
+import io
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from invenio_db import db
+from invenio_files_rest.models import Bucket, BucketTag, FileInstance, \
+    Location, ObjectVersion
+from invenio_pidstore.models import PersistentIdentifier, PIDStatus, \
+    RecordIdentifier
+from invenio_records.models import RecordMetadata
+from invenio_records_files.models import RecordsBuckets
+from six import text_type
+from sqlalchemy_continuum import version_class
+
+from .records import RecordDumpLoader
+from .utils import create_transactions, object_rows, version_rows, \
+    versioning_manager
+
+
+def _complete_row(table, values):
+    """Fill in the default values of the columns missing from a row."""
+    row = {}
+    for column in table.columns:
+        if column.name in values:
+            row[column.name] = values[column.name]
+        elif column.primary_key:
+            # Generated by the database.
+            continue
+        elif column.default is not None and column.default.is_scalar:
+            row[column.name] = column.default.arg
+        elif column.default is not None and column.default.is_callable:
+            row[column.name] = column.default.arg(None)
+        else:
+            row[column.name] = None
+    return row
+
+
+def _copy_value(value):
+    """Format a value for the text format of ``COPY``."""
+    if value is None:
+        return u'\\N'
+    if isinstance(value, bool):
+        return u't' if value else u'f'
+    if isinstance(value, datetime):
+        return text_type(value.isoformat())
+    return text_type(value).replace(u'\\', u'\\\\').replace(
+        u'\t', u'\\t').replace(u'\n', u'\\n').replace(u'\r', u'\\r')
+
+
+def _copy_rows(table, rows):
+    """Write rows into a table with ``COPY FROM STDIN``."""
+    dialect = db.engine.dialect
+    columns = [c for c in table.columns if c.name in rows[0]]
+    processors = [
+        c.type.dialect_impl(dialect).bind_processor(dialect) for c in columns
+    ]
+    data = io.StringIO()
+    for row in rows:
+        values = []
+        for column, process in zip(columns, processors):
+            value = row[column.name]
+            values.append(_copy_value(process(value) if process else value))
+        data.write(u'\t'.join(values))
+        data.write(u'\n')
+    data.seek(0)
+
+    preparer = dialect.identifier_preparer
+    sql = 'COPY {0} ({1}) FROM STDIN'.format(
+        preparer.format_table(table),
+        ', '.join(preparer.quote(c.name) for c in columns),
+    )
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(sql, data)
+    finally:
+        cursor.close()
+
+
+def write_rows(table, rows):
+    """Write rows into a table.
+
+    Rows are written with ``COPY FROM STDIN`` on PostgreSQL and with a single
+    multi-row insert on other databases. Missing columns get their default
+    value.
+
+    :param table: Table.
+    :param rows: List of dictionaries mapping column names to values.
+    """
+    if not rows:
+        return
+    rows = [_complete_row(table, r) for r in rows]
+    if db.engine.dialect.name == 'postgresql':
+        _copy_rows(table, rows)
+    else:
+        db.session.execute(table.insert(), rows)
+
+
+class RecordDumpCopyLoader(RecordDumpLoader):
+    """Load batches of record dumps with bulk copies."""
+
+    @classmethod
+    def create(cls, dump):
+        """Create a record based on dump.
+
+        :returns: Identifier of the created record.
+        """
+        return cls.create_all([dump])[0]
+
+    @classmethod
+    def create_all(cls, dumps):
+        """Create records based on dumps.
+
+        :param dumps: List of record dumps.
+        :returns: List of the identifiers of the created records (``None``
+            for dumps which only reserve a record identifier).
+        """
+        db.session.flush()
+        rows = dict((table, []) for table in cls.tables())
+        location = Location.get_default()
+        records = []
+        for dump in dumps:
+            records.append(cls.dump_rows(dump, rows, location))
+
+        if versioning_manager() is not None:
+            versions_rows = rows[version_class(RecordMetadata).__table__]
+            transaction_ids = iter(cls.create_transactions(
+                sum(len(r[2]) for r in records if r)))
+            for record_id, created, revisions in filter(None, records):
+                versions_rows.extend(version_rows(
+                    record_id, created, revisions,
+                    [next(transaction_ids) for r in revisions]))
+
+        for table in cls.tables():
+            write_rows(table, rows[table])
+        RecordIdentifier._set_sequence(RecordIdentifier.max())
+        return [r[0] if r else None for r in records]
+
+    @classmethod
+    def tables(cls):
+        """Get the tables written by the loader, in insertion order."""
+        tables = [RecordMetadata.__table__]
+        if versioning_manager() is not None:
+            tables.append(version_class(RecordMetadata).__table__)
+        return tables + [
+            RecordIdentifier.__table__,
+            PersistentIdentifier.__table__,
+            Bucket.__table__,
+            BucketTag.__table__,
+            RecordsBuckets.__table__,
+            FileInstance.__table__,
+            ObjectVersion.__table__,
+        ]
+
+    @classmethod
+    def create_transactions(cls, count):
+        """Create the versioning transactions of the record versions.
+
+        :param count: Number of transactions.
+        :returns: List of transaction identifiers.
+        """
+        return create_transactions(count, insert_rows=write_rows)
+
+    @classmethod
+    def dump_rows(cls, dump, rows, location):
+        """Build the rows of a record dump.
+
+        :param dump: Record dump.
+        :param rows: Dictionary mapping each table to the list of its rows,
+            to which the rows of the dump are added.
+        :param location: Location of the buckets.
+        :returns: A tuple ``(record_id, created, versions)`` where
+            ``versions`` is the list of ``(updated, json)`` of each version of
+            the record, or ``None`` if the dump only reserves a record
+            identifier.
+        """
+        pid_rows = rows[PersistentIdentifier.__table__]
+        if not dump.data.get('record'):
+            pid_rows.append(dict(
+                pid_type='recid',
+                pid_value=str(dump.recid),
+                status=PIDStatus.RESERVED,
+            ))
+            return None
+
+        dump.prepare_revisions()
+        if current_app.config['MIGRATOR_RECORDS_SKIP_IDENTICAL_REVISIONS']:
+            dump.skip_identical_revisions()
+        dump.prepare_pids()
+        dump.prepare_files()
+
+        record_id = uuid.uuid4()
+        created = dump.created.replace(tzinfo=None)
+        versions = [
+            (dt.replace(tzinfo=None), val) for dt, val in dump.revisions]
+        updated, data = versions[-1]
+        deleted = dump.is_deleted(data)
+
+        if dump.files:
+            bucket_id = uuid.uuid4()
+            objects = cls.file_objects(dump.files)
+            file_rows, obj_rows = object_rows(bucket_id, objects)
+            heads = dict((o['key'], o) for o in objects if o['is_head'])
+            data = dict(data, _files=[
+                cls.file_entry(key, heads[key]) for key in dump.files])
+            versions.append((updated, data))
+            rows[Bucket.__table__].append(dict(
+                id=bucket_id,
+                default_location=location.id,
+                size=sum(o['size'] for o in objects),
+                deleted=deleted,
+            ))
+            rows[BucketTag.__table__].append(dict(
+                bucket_id=bucket_id, key='record', value=str(record_id)))
+            rows[RecordsBuckets.__table__].append(dict(
+                record_id=record_id, bucket_id=bucket_id))
+            rows[FileInstance.__table__].extend(file_rows)
+            rows[ObjectVersion.__table__].extend(obj_rows)
+
+        if deleted:
+            versions.append((updated, None))
+
+        rows[RecordMetadata.__table__].append(dict(
+            id=record_id,
+            json=versions[-1][1],
+            created=created,
+            updated=updated,
+            version_id=len(versions),
+        ))
+        rows[RecordIdentifier.__table__].append(dict(recid=dump.recid))
+        status = PIDStatus.DELETED if deleted else PIDStatus.REGISTERED
+        pid_rows.append(dict(
+            pid_type='recid',
+            pid_value=str(dump.recid),
+            object_type='rec',
+            object_uuid=record_id,
+            status=status,
+        ))
+        for p in dump.pids:
+            pid_rows.append(dict(
+                pid_type=p.pid_type,
+                pid_value=p.pid_value,
+                pid_provider=p.provider.pid_provider if p.provider else None,
+                object_type='rec',
+                object_uuid=record_id,
+                status=status,
+            ))
+        return record_id, created, versions
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Bounded dispatch of load tasks."""
+
+from __future__ import absolute_import, print_function
+
+import time
+from collections import deque
+
+import click
+from celery.backends.base import DisabledBackend
+
+
+class DispatchWindow(object):
+    """Bound the number of dispatched tasks which have not completed yet.
+
+    Without a bound, dump items are sent to the broker much faster than the
+    workers can load them, so that the whole dump ends up queued in the
+    broker. With a window of ``size`` tasks, the dispatch pauses as soon as
+    ``size`` tasks are in flight, until some of them complete. Completions
+    are tracked through the result backend, which must be enabled. The tasks
+    are checked in the order they were dispatched, which is roughly the order
+    in which the workers complete them.
+
+    The throughput of the workers is reported every ``report_interval``
+    seconds.
+    """
+
+    def __init__(self, size=0, poll_interval=0.2, report_interval=10):
+        """Initialize the window.
+
+        :param size: Maximum number of tasks in flight (``0`` for no limit).
+        :param poll_interval: Seconds to wait before checking again for
+            completed tasks when the window is full.
+        :param report_interval: Seconds between two throughput reports.
+        """
+        self.size = size
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.pending = deque()
+        self.dispatched = 0
+        self.completed = 0
+        self.failed = 0
+        self.started = self.reported = time.time()
+
+    def add(self, result):
+        """Track a dispatched task, waiting while the window is full.
+
+        :param result: ``celery.result.AsyncResult`` of the task. For a
+            chain of tasks, the first task of the chain is tracked, since the
+            rest of the chain never completes if it fails.
+        """
+        self.dispatched += 1
+        if not self.size or result is None:
+            return
+        while getattr(result, 'parent', None) is not None:
+            result = result.parent
+        if isinstance(result.backend, DisabledBackend):
+            raise click.UsageError(
+                'Bounding the tasks in flight requires a result backend.')
+        self.pending.append(result)
+        while len(self.pending) >= self.size:
+            if not self.poll():
+                time.sleep(self.poll_interval)
+            self.report()
+
+    def poll(self):
+        """Forget the completed tasks.
+
+        The tasks are checked up to the first one which has not completed,
+        instead of querying the result backend for all the tasks in flight.
+
+        :returns: Number of tasks which completed since the last poll.
+        """
+        completed = 0
+        while self.pending and self.pending[0].ready():
+            result = self.pending.popleft()
+            if result.failed():
+                self.failed += 1
+            result.forget()
+            completed += 1
+        self.completed += completed
+        return completed
+
+    def join(self):
+        """Wait for all the tasks in flight to complete."""
+        while self.pending:
+            if not self.poll():
+                time.sleep(self.poll_interval)
+            self.report()
+        if self.size:
+            self.report(force=True)
+
+    def report(self, force=False):
+        """Report the throughput of the workers.
+
+        :param force: Report even if the report interval has not elapsed.
+        """
+        now = time.time()
+        if not force and now - self.reported < self.report_interval:
+            return
+        self.reported = now
+        click.echo(
+            '{0} of {1} tasks completed ({2:.1f}/s), {3} failed, '
+            '{4} in flight.'.format(
+                self.completed, self.dispatched,
+                self.completed / max(now - self.started, 1e-6),
+                self.failed, len(self.pending)))
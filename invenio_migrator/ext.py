@@ -28,8 +28,10 @@ from __future__ import absolute_import, print_function
 
 from werkzeug.utils import cached_property, import_string
 
+from .cache import ConversionCache
 from .cli import dumps
 from .records import RecordDump, RecordDumpLoader
+from .utils import suppress_timestamps
 
 
 def config_imp_or_default(app, config_var_imp, default):
@@ -62,11 +64,28 @@ class _InvenioMigratorState(object):
             self.app.config.get('MIGRATOR_RECORDS_PID_FETCHERS', [])
         ]
 
+    @cached_property
+    def records_conversion_cache(self):
+        size = self.app.config['MIGRATOR_RECORDS_CONVERSION_CACHE_SIZE']
+        directory = self.app.config['MIGRATOR_RECORDS_CONVERSION_CACHE_DIR']
+        if not size and not directory:
+            return None
+        return ConversionCache(maxsize=size, directory=directory)
+
+    @cached_property
+    def records_validators(self):
+        return {}
+
     @cached_property
     def records_post_task(self):
         return config_imp_or_default(
             self.app, 'MIGRATOR_RECORDS_POST_TASK', None)
 
+    @cached_property
+    def records_bulk_post_task(self):
+        return config_imp_or_default(
+            self.app, 'MIGRATOR_RECORDS_BULK_POST_TASK', None)
+
 
 class InvenioMigrator(object):
     """Invenio-Migrator extension."""
@@ -79,6 +98,8 @@ class InvenioMigrator(object):
     def init_app(self, app):
         """Flask application initialization."""
         self.init_config(app.config)
+        if app.config['MIGRATOR_SUPPRESS_TIMESTAMPS']:
+            suppress_timestamps()
         state = _InvenioMigratorState(app)
         app.extensions['invenio-migrator'] = state
         app.cli.add_command(dumps)
@@ -86,9 +107,22 @@ class InvenioMigrator(object):
 
     def init_config(self, config):
         """Initialize config."""
+        config.setdefault('MIGRATOR_FILES_BULK_INSERT', False)
         config.setdefault('MIGRATOR_FILES_POST_TASK', None)
+        config.setdefault('MIGRATOR_MAX_IN_FLIGHT', 0)
+        config.setdefault('MIGRATOR_RECORDS_BULK_POST_TASK', None)
+        config.setdefault('MIGRATOR_RECORDS_BULK_VERSIONS', False)
+        config.setdefault('MIGRATOR_RECORDS_CONVERSION_CACHE_DIR', None)
+        config.setdefault('MIGRATOR_RECORDS_CONVERSION_CACHE_SIZE', 0)
+        config.setdefault('MIGRATOR_RECORDS_DEFER_HOOKS', False)
+        config.setdefault('MIGRATOR_RECORDS_DELETED_FAST_PATH', False)
+        config.setdefault('MIGRATOR_RECORDS_DELETED_FILES', True)
+        config.setdefault('MIGRATOR_RECORDS_INCREMENTAL_UPDATE', False)
         config.setdefault('MIGRATOR_RECORDS_POST_TASK', None)
         config.setdefault('MIGRATOR_RECORDS_PID_FETCHERS', [])
+        config.setdefault('MIGRATOR_RECORDS_SINGLE_TRANSACTION', False)
+        config.setdefault('MIGRATOR_RECORDS_SKIP_IDENTICAL_REVISIONS', False)
+        config.setdefault('MIGRATOR_SUPPRESS_TIMESTAMPS', False)
 
     def __getattr__(self, name):
         """Proxy to state object."""
@@ -30,7 +30,7 @@ import datetime
 
 import click
 
-from .utils import datetime_toutc
+from .utils import datetime_toutc, intbitset
 
 
 def _get_recids_invenio12(from_date):
@@ -56,9 +56,9 @@ def _get_recids_invenio2(from_date):
 def get_modified_bibdoc_recids(from_date):
     """Get bibdocs."""
     try:
-        return set(_get_recids_invenio12(from_date))
+        return intbitset(_get_recids_invenio12(from_date))
     except ImportError:
-        return set(_get_recids_invenio2(from_date))
+        return intbitset(_get_recids_invenio2(from_date))
 
 
 def _import_bibdoc():
@@ -26,9 +26,14 @@
 
 from __future__ import absolute_import, print_function
 
+import hashlib
 import json
+import os
+from collections import deque
+from multiprocessing import Pool
 
 import click
+import six
 
 from .utils import (
     collect_things_entry_points,
@@ -37,6 +42,9 @@ from .utils import (
     set_serializer
 )
 
+_worker_thing_func = None
+"""Dump functions of the thing dumped by a worker process."""
+
 
 @click.group()
 def cli():
@@ -44,6 +52,134 @@ def cli():
     pass
 
 
+def _item_id(item):
+    """Get an identifier of an item to dump, suitable for the manifest."""
+    _id = item.get('id') if isinstance(item, dict) else \
+        getattr(item, 'id', item)
+    if isinstance(_id, six.integer_types + six.string_types):
+        return _id
+    return str(_id)
+
+
+def _file_checksum(filename):
+    """Compute the MD5 checksum of a file."""
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as fp:
+        for data in iter(lambda: fp.read(1024 * 1024), b''):
+            md5.update(data)
+    return 'md5:{0}'.format(md5.hexdigest())
+
+
+def _read_manifest(filename):
+    """Read a dump manifest (``None`` if it does not exist)."""
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as fp:
+        return json.load(fp)
+
+
+def _write_manifest(filename, manifest):
+    """Write a dump manifest atomically."""
+    with open(filename + '.tmp', 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.rename(filename + '.tmp', filename)
+
+
+def _is_chunk_done(info, filename, chunk_ids):
+    """Check if a chunk in the manifest matches an already dumped file.
+
+    A chunk whose items did not all dump is not done, so that it is dumped
+    again.
+    """
+    return (
+        info is not None and
+        not info['failures'] and
+        info['file'] == filename and
+        info['count'] == len(chunk_ids) and
+        info['first'] == _item_id(chunk_ids[0]) and
+        info['last'] == _item_id(chunk_ids[-1]) and
+        os.path.exists(filename) and
+        _file_checksum(filename) == info['checksum']
+    )
+
+
+def _dump_chunk(thing_func, filename, chunk_ids, from_date, kwargs,
+                progress=None):
+    """Dump a chunk of items into a JSON file.
+
+    :param thing_func: Module with the dump functions of the thing.
+    :param filename: Name of the chunk file.
+    :param chunk_ids: Items to dump.
+    :param from_date: Dump only changes from this date onwards.
+    :param kwargs: Keyword arguments passed to the dump function.
+    :param progress: Function called with ``1`` after each item.
+    :returns: Manifest entry of the chunk, with the file name and checksum,
+        the number of items, the identifiers of the first and last items and
+        a list of ``(item, error)`` for the items which failed.
+    """
+    # Let the thing fetch data for the whole chunk at once, if supported.
+    prefetch = getattr(thing_func, 'prefetch', None)
+    if prefetch is not None:
+        prefetch(chunk_ids, from_date, **kwargs)
+
+    failures = []
+    with open(filename, 'w') as fp:
+        fp.write("[\n")
+        for _id in chunk_ids:
+            try:
+                json.dump(
+                    thing_func.dump(_id, from_date, **kwargs),
+                    fp,
+                    default=set_serializer
+                )
+                fp.write(",")
+            except Exception as e:
+                failures.append((_item_id(_id), str(e)))
+            if progress:
+                progress(1)
+
+        # Strip trailing comma.
+        fp.seek(fp.tell()-1)
+        fp.write("\n]")
+
+    return dict(
+        file=filename,
+        checksum=_file_checksum(filename),
+        count=len(chunk_ids),
+        first=_item_id(chunk_ids[0]),
+        last=_item_id(chunk_ids[-1]),
+        failures=failures,
+    )
+
+
+def _init_worker(thing):
+    """Initialize a worker process of a parallel dump."""
+    global _worker_thing_func
+    init_app_context()
+    _worker_thing_func = collect_things_entry_points()[thing]
+
+
+def _dump_chunk_worker(args):
+    """Dump a chunk of items in a worker process."""
+    return _dump_chunk(_worker_thing_func, *args)
+
+
+def _imap_bounded(pool, func, iterable, window):
+    """Map ``func`` over ``iterable`` with at most ``window`` pending tasks.
+
+    Contrary to ``Pool.imap``, the iterable is only consumed as fast as the
+    workers process it, so that lazily fetched items are not all loaded in
+    memory at once.
+    """
+    pending = deque()
+    for args in iterable:
+        pending.append(pool.apply_async(func, (args, )))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
 @cli.command(context_settings=dict(
     ignore_unknown_options=True,
 ))
@@ -53,9 +189,25 @@ def cli():
 @click.option('--file-prefix', default=None)
 @click.option('--chunk-size', default=1000)
 @click.option('--limit', type=int, default=0)
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              help='Number of processes dumping chunks in parallel.')
+@click.option('--resume', is_flag=True, default=False,
+              help='Skip the chunks dumped without failures according to the '
+                   'manifest of a previous run.')
 @click.argument('thing_flags', nargs=-1, type=click.UNPROCESSED)
-def dump(thing, query, from_date, file_prefix, chunk_size, limit, thing_flags):
-    """Dump data from Invenio legacy."""
+def dump(thing, query, from_date, file_prefix, chunk_size, limit, jobs,
+         resume, thing_flags):
+    """Dump data from Invenio legacy.
+
+    With ``--jobs`` greater than one, the chunks are dumped by a pool of
+    worker processes, each of them writing its own chunk files. The items
+    returned for the thing must then be picklable (e.g. record identifiers).
+
+    The range of identifiers, item count, failures and checksum of each chunk
+    are recorded in a ``<file prefix>_manifest.json`` file. With ``--resume``
+    the chunks whose file is still intact and which had no failures are not
+    dumped again.
+    """
     init_app_context()
 
     file_prefix = file_prefix if file_prefix else '{0}_dump'.format(thing)
@@ -69,32 +221,78 @@ def dump(thing, query, from_date, file_prefix, chunk_size, limit, thing_flags):
             '{0} is not in the list of available things to migrate: '
             '{1}'.format(thing, collect_things_entry_points()))
 
+    manifest_file = '{0}_manifest.json'.format(file_prefix)
+    manifest = dict(
+        thing=thing,
+        query=query,
+        from_date=from_date,
+        chunk_size=chunk_size,
+        limit=limit,
+        flags=kwargs,
+        chunks={},
+    )
+    previous_chunks = {}
+    if resume:
+        previous = _read_manifest(manifest_file)
+        if previous is not None:
+            if any(previous.get(k) != v for k, v in manifest.items()
+                   if k != 'chunks'):
+                raise click.UsageError(
+                    'Cannot resume, the dump parameters differ from the ones '
+                    'in {0}.'.format(manifest_file))
+            previous_chunks = previous['chunks']
+
+    # Start the workers before querying, so that they do not inherit the
+    # connections to the legacy database.
+    pool = None
+    if jobs > 1:
+        pool = Pool(processes=jobs, initializer=_init_worker,
+                    initargs=(thing, ))
+
     click.echo("Querying {0}...".format(thing))
     count, items = thing_func.get(query, from_date, limit=limit, **kwargs)
 
-    progress_i = 0  # Progress bar counter
+    failed = 0
     click.echo("Dumping {0}...".format(thing))
     with click.progressbar(length=count) as bar:
-        for i, chunk_ids in enumerate(grouper(items, chunk_size)):
-            with open('{0}_{1}.json'.format(file_prefix, i), 'w') as fp:
-                fp.write("[\n")
-                for _id in chunk_ids:
-                    try:
-                        json.dump(
-                            thing_func.dump(_id, from_date, **kwargs),
-                            fp,
-                            default=set_serializer
-                        )
-                        fp.write(",")
-                    except Exception as e:
-                        click.secho("Failed dump {0} {1} ({2})".format(
-                            thing, _id, e.message), fg='red')
-                    progress_i += 1
-                    bar.update(progress_i)
-
-                # Strip trailing comma.
-                fp.seek(fp.tell()-1)
-                fp.write("\n]")
+
+        def _chunks():
+            for i, chunk_ids in enumerate(grouper(items, chunk_size)):
+                filename = '{0}_{1}.json'.format(file_prefix, i)
+                info = previous_chunks.get(str(i))
+                if _is_chunk_done(info, filename, chunk_ids):
+                    manifest['chunks'][str(i)] = info
+                    bar.update(len(chunk_ids))
+                    continue
+                yield filename, chunk_ids, from_date, kwargs
+
+        if pool is None:
+            results = (
+                _dump_chunk(thing_func, *args, progress=bar.update)
+                for args in _chunks()
+            )
+        else:
+            results = _imap_bounded(
+                pool, _dump_chunk_worker, _chunks(), window=2 * jobs)
+        try:
+            for info in results:
+                if pool is not None:
+                    bar.update(info['count'])
+                for _id, error in info['failures']:
+                    click.secho("Failed dump {0} {1} ({2})".format(
+                        thing, _id, error), fg='red')
+                failed += len(info['failures'])
+                index = info['file'][len(file_prefix) + 1:-len('.json')]
+                manifest['chunks'][index] = info
+                _write_manifest(manifest_file, manifest)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    _write_manifest(manifest_file, manifest)
+    if failed:
+        click.secho("{0} {1} failed to dump.".format(failed, thing), fg='red')
 
 
 @cli.command()
@@ -26,12 +26,13 @@
 
 from __future__ import absolute_import, print_function
 
+from .utils import stream_query
+
 
 def get(*args, **kwargs):
     """Get users."""
     from invenio.modules.oauth2server.models import Client
-    q = Client.query
-    return q.count(), q.all()
+    return stream_query(Client)
 
 
 def dump(obj, from_date, with_json=True, latest_only=False, **kwargs):
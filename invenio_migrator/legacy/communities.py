@@ -81,14 +81,13 @@ the community logos.
 
 from __future__ import absolute_import, print_function
 
-from .utils import dt2iso_or_empty
+from .utils import dt2iso_or_empty, stream_query
 
 
 def get(*args, **kwargs):
     """Get communities."""
     from invenio.modules.communities.models import Community
-    q = Community.query
-    return q.count(), q.all()
+    return stream_query(Community)
 
 
 def dump(c, from_date, with_json=True, latest_only=False, **kwargs):
@@ -54,8 +54,8 @@ def default_serializer(o):
 def _get_depositions(user=None, type=None):
     """Get list of depositions (as iterator).
 
-    This is redefined Deposition.get_depositions classmethod without order-by
-    for better performance.
+    This is redefined Deposition.get_depositions classmethod ordered only by
+    the primary key for better performance and stable dump chunks.
     """
     from invenio.modules.workflows.models import BibWorkflowObject, Workflow
     from invenio.modules.deposit.models import InvalidDepositionType
@@ -75,7 +75,8 @@ def _get_depositions(user=None, type=None):
         params.append(Workflow.name == type.get_identifier())
 
     objects = BibWorkflowObject.query.join("workflow").options(
-        db.contains_eager('workflow')).filter(*params)
+        db.contains_eager('workflow')).filter(*params).order_by(
+            BibWorkflowObject.id)
 
     def _create_obj(o):
         try:
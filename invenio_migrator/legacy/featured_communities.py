@@ -26,12 +26,13 @@
 
 from __future__ import absolute_import, print_function
 
+from .utils import stream_query
+
 
 def get(*args, **kwargs):
     """Get communities."""
     from invenio.modules.communities.models import FeaturedCommunity
-    q = FeaturedCommunity.query
-    return q.count(), q.all()
+    return stream_query(FeaturedCommunity)
 
 
 def dump(fc, from_date, with_json=True, latest_only=False, **kwargs):
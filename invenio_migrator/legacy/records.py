@@ -29,14 +29,20 @@ import datetime
 import zlib
 
 from .bibdocfile import dump_bibdoc, get_modified_bibdoc_recids
-from .utils import datetime_toutc, memoize
+from .utils import datetime_toutc, grouper, intbitset, memoize
+
+PREFETCH_SIZE = 500
+"""Maximum number of records whose revisions are fetched in one query."""
+
+_revisions_cache = {}
+"""Revisions prefetched for the chunk being dumped."""
 
 
 def _get_modified_recids_invenio12(from_date):
     """Get record ids for Invenio 1."""
     from invenio.search_engine import search_pattern
     from invenio.dbquery import run_sql
-    return set((id[0] for id in run_sql(
+    return intbitset((id[0] for id in run_sql(
         'select id from bibrec where modification_date >= %s',
         (from_date, ), run_on_slave=True))), search_pattern
 
@@ -47,7 +53,7 @@ def _get_modified_recids_invenio2(from_date):
     from invenio.modules.records.models import Record
 
     date = datetime.datetime.strptime(from_date, '%Y-%m-%d %H:%M:%S')
-    return set(
+    return intbitset(
         (x[0]
          for x in Record.query.filter(Record.modification_date >= date).values(
              Record.id))), search_pattern
@@ -93,13 +99,73 @@ def get_modified_recids(from_date):
         return _get_modified_recids_invenio2(from_date)
 
 
-def get_record_revisions(recid, from_date):
-    """Get record revisions."""
+def get_records_revisions(recids, from_date, latest_only=False):
+    """Get the revisions of several records.
+
+    :param recids: Record identifiers.
+    :param from_date: Get only revisions from this date onwards.
+    :param latest_only: Get only the last revision of each record.
+    :returns: Dictionary mapping each record identifier to its revisions.
+    """
+    try:
+        from invenio.dbquery import run_sql
+    except ImportError:
+        from invenio.legacy.dbquery import run_sql
+
+    if latest_only:
+        query = (
+            'SELECT h.id_bibrec, h.job_date, h.marcxml FROM hstRECORD AS h '
+            'JOIN (SELECT id_bibrec, MAX(job_date) AS job_date '
+            'FROM hstRECORD WHERE id_bibrec IN ({0}) AND job_date >= %s '
+            'GROUP BY id_bibrec) AS l '
+            'ON h.id_bibrec = l.id_bibrec AND h.job_date = l.job_date '
+            'ORDER BY h.id_bibrec, h.job_date ASC')
+    else:
+        query = (
+            'SELECT id_bibrec, job_date, marcxml '
+            'FROM hstRECORD WHERE id_bibrec IN ({0}) AND job_date >= %s '
+            'ORDER BY id_bibrec, job_date ASC')
+
+    revisions = dict((recid, []) for recid in recids)
+    for batch in grouper(revisions.keys(), PREFETCH_SIZE):
+        res = run_sql(
+            query.format(', '.join(['%s'] * len(batch))),
+            batch + (from_date, ),
+            run_on_slave=True)
+        for recid, job_date, marcxml in res:
+            revisions[recid].append((job_date, marcxml))
+
+    if latest_only:
+        # Revisions sharing the same date are all returned by the join.
+        for recid in revisions:
+            revisions[recid] = revisions[recid][-1:]
+    return revisions
+
+
+def get_record_revisions(recid, from_date, latest_only=False):
+    """Get record revisions.
+
+    :param recid: Record identifier.
+    :param from_date: Get only revisions from this date onwards.
+    :param latest_only: Get only the last revision of the record, instead of
+        transferring all of them from the database.
+    """
+    key = (recid, from_date, latest_only)
+    if key in _revisions_cache:
+        return _revisions_cache.pop(key)
+
     try:
         from invenio.dbquery import run_sql
     except ImportError:
         from invenio.legacy.dbquery import run_sql
 
+    if latest_only:
+        return run_sql(
+            'SELECT job_date, marcxml '
+            'FROM hstRECORD WHERE id_bibrec = %s AND job_date >= %s '
+            'ORDER BY job_date DESC LIMIT 1', (recid, from_date),
+            run_on_slave=True)
+
     return run_sql(
         'SELECT job_date, marcxml '
         'FROM hstRECORD WHERE id_bibrec = %s AND job_date >= %s '
@@ -143,17 +209,37 @@ def dump_record_json(marcxml):
 
 
 def get(query, from_date, **kwargs):
-    """Get recids matching query and with changes."""
+    """Get recids matching query and with changes.
+
+    Record identifiers are kept in an ``intbitset``, which is both compact
+    and iterated in ascending order.
+    """
     recids, search_pattern = get_modified_recids(from_date)
-    recids = recids.union(get_modified_bibdoc_recids(from_date))
+    recids |= get_modified_bibdoc_recids(from_date)
 
     if query:
-        recids = recids.intersection(
-            set(search_pattern(p=query.encode('utf-8'))))
+        recids &= search_pattern(p=query.encode('utf-8'))
 
     return len(recids), recids
 
 
+def prefetch(recids, from_date, latest_only=False, **kwargs):
+    """Prefetch the revisions of a chunk of records.
+
+    The revisions are fetched with a few queries for the whole chunk instead
+    of one query per record, and are then consumed by :func:`dump`.
+
+    :param recids: Record identifiers of the chunk.
+    :param from_date: Dump only revisions from this date onwards.
+    :param latest_only: Prefetch only the last revision of each record.
+    """
+    _revisions_cache.clear()
+    revisions = get_records_revisions(
+        recids, from_date, latest_only=latest_only)
+    for recid, record_revisions in revisions.items():
+        _revisions_cache[(recid, from_date, latest_only)] = record_revisions
+
+
 def dump(recid,
          from_date,
          with_json=False,
@@ -172,10 +258,12 @@ def dump(recid,
     :returns: List of versions of the record.
     """
     # Grab latest only
+    revisions = get_record_revisions(
+        recid, from_date, latest_only=latest_only)
     if latest_only:
-        revision_iter = [get_record_revisions(recid, from_date)[-1]]
+        revision_iter = [revisions[-1]]
     else:
-        revision_iter = get_record_revisions(recid, from_date)
+        revision_iter = revisions
 
     # Dump revisions
     record_dump = dict(
@@ -26,12 +26,13 @@
 
 from __future__ import absolute_import, print_function
 
+from .utils import stream_query
+
 
 def get(*args, **kwargs):
     """Get users."""
     from invenio.modules.oauthclient.models import RemoteToken
-    q = RemoteToken.query
-    return q.count(), q.all()
+    return stream_query(RemoteToken)
 
 
 def dump(rt, from_date, with_json=True, latest_only=False, **kwargs):
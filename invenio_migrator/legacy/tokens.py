@@ -26,14 +26,13 @@
 
 from __future__ import absolute_import, print_function
 
-from .utils import dt2iso_or_empty
+from .utils import dt2iso_or_empty, stream_query
 
 
 def get(*args, **kwargs):
     """Get users."""
     from invenio.modules.oauth2server.models import Token
-    q = Token.query
-    return q.count(), q.all()
+    return stream_query(Token)
 
 
 def dump(obj, from_date, with_json=True, latest_only=False, **kwargs):
@@ -26,6 +26,8 @@
 
 from __future__ import absolute_import, print_function
 
+from .utils import stream_query
+
 
 def get(*args, **kwargs):
     """Get UserEXT objects."""
@@ -33,8 +35,7 @@ def get(*args, **kwargs):
         from invenio.modules.accounts.models import UserEXT
     except ImportError:
         from invenio_accounts.models import UserEXT
-    q = UserEXT.query
-    return q.count(), q.all()
+    return stream_query(UserEXT)
 
 
 def dump(u, from_date, with_json=True, latest_only=False, **kwargs):
@@ -26,7 +26,7 @@
 from __future__ import absolute_import, print_function
 
 from collections import namedtuple
-from .utils import dt2iso_or_empty
+from .utils import dt2iso_or_empty, stream_query
 
 
 def _get_users_invenio12(*args, **kwargs):
@@ -36,30 +36,40 @@ def _get_users_invenio12(*args, **kwargs):
         'id', 'email', 'password', 'password_salt', 'note', 'full_name',
         'settings', 'nickname', 'last_login'
     ])
-    users = run_sql(
-        'SELECT id, email, password, note, settings, nickname, last_login'
-        ' FROM user',
-        run_on_slave=True)
-    return len(users), [
-        User(
-            id=user[0],
-            email=user[1],
-            password=user[2].decode('latin1'),
-            password_salt=user[1],
-            note=user[3],
-            full_name=user[5],
-            settings=deserialize_via_marshal(user[4]) if user[4] else {},
-            # we don't have proper nicknames on Invenio v1
-            nickname='id_{0}'.format(user[0]),
-            last_login=user[6]) for user in users
-    ]
+    count = run_sql('SELECT COUNT(*) FROM user', run_on_slave=True)[0][0]
+
+    def _iter_users(batch_size=1000):
+        last_id = -1
+        while True:
+            users = run_sql(
+                'SELECT id, email, password, note, settings, nickname, '
+                'last_login FROM user WHERE id > %s ORDER BY id LIMIT %s',
+                (last_id, batch_size),
+                run_on_slave=True)
+            if not users:
+                return
+            for user in users:
+                yield User(
+                    id=user[0],
+                    email=user[1],
+                    password=user[2].decode('latin1'),
+                    password_salt=user[1],
+                    note=user[3],
+                    full_name=user[5],
+                    settings=deserialize_via_marshal(user[4])
+                    if user[4] else {},
+                    # we don't have proper nicknames on Invenio v1
+                    nickname='id_{0}'.format(user[0]),
+                    last_login=user[6])
+            last_id = users[-1][0]
+
+    return count, _iter_users()
 
 
 def _get_users_invenio2(*args, **kwargs):
     """Get user accounts from Invenio 2."""
     from invenio.modules.accounts.models import User
-    q = User.query
-    return q.count(), q.all()
+    return stream_query(User)
 
 
 def get(*args, **kwargs):
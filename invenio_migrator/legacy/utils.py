@@ -49,6 +49,53 @@ def grouper(iterable, n):
         yield chunk
 
 
+def intbitset(*args):
+    """Create a compact set of integers from Invenio 1 or Invenio 2."""
+    try:
+        from invenio.intbitset import intbitset as _intbitset
+    except ImportError:
+        from intbitset import intbitset as _intbitset
+    return _intbitset(*args)
+
+
+def stream_query(model, batch_size=1000):
+    """Count and lazily iterate over all objects of a model.
+
+    Instead of loading all objects at once with ``query.all()``, objects are
+    fetched in batches ordered by primary key (using keyset pagination when
+    the primary key is a single column). Unlike a server-side cursor, this
+    leaves the connection free for the queries issued while dumping each
+    object.
+
+    :param model: SQLAlchemy model class.
+    :param batch_size: Number of objects fetched per query.
+    :returns: Tuple with the number of objects and an iterator over them.
+    """
+    from sqlalchemy import inspect
+
+    query = model.query
+    primary_key = inspect(model).primary_key
+
+    def _iter():
+        ordered = query.order_by(*primary_key)
+        last, offset = None, 0
+        while True:
+            if len(primary_key) == 1:
+                q = ordered if last is None else \
+                    ordered.filter(primary_key[0] > last)
+            else:
+                q = ordered.offset(offset)
+            batch = q.limit(batch_size).all()
+            if not batch:
+                return
+            for obj in batch:
+                yield obj
+            offset += len(batch)
+            last = inspect(batch[-1]).identity[0]
+
+    return query.count(), _iter()
+
+
 def collect_things_entry_points():
     """Collect entry points."""
     things = dict()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Database models for Invenio-Migrator."""
+
+from __future__ import absolute_import, print_function
+
+from enum import Enum
+
+from invenio_db import db
+from sqlalchemy_utils.models import Timestamp
+from sqlalchemy_utils.types import ChoiceType, UUIDType
+
+
+class LoadStatus(Enum):
+    """Status of a dump item in the load ledger."""
+
+    DISPATCHED = 'D'
+    """The item has been sent to a worker."""
+
+    SUCCEEDED = 'S'
+    """The item has been loaded."""
+
+    FAILED = 'F'
+    """The item could not be loaded."""
+
+
+class LoadLedger(db.Model, Timestamp):
+    """Progress ledger of the items loaded from dump files.
+
+    Each item is identified by the dump file it comes from and its position in
+    the file. The identifier of the item (e.g. the record identifier) is kept
+    as well, so that a dump file which has been regenerated in place is not
+    mistaken for the one already loaded.
+    """
+
+    __tablename__ = 'migrator_load_ledger'
+
+    dump = db.Column(db.String(255), primary_key=True)
+    """Absolute path of the dump file."""
+
+    item_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    """Position of the item in the dump file."""
+
+    item_id = db.Column(db.String(255), nullable=True)
+    """Identifier of the item."""
+
+    status = db.Column(ChoiceType(LoadStatus, impl=db.CHAR(1)),
+                       nullable=False)
+    """Status of the item."""
+
+    error = db.Column(db.Text, nullable=True)
+    """Error message of a failed item."""
+
+    record_id = db.Column(UUIDType, nullable=True)
+    """UUID of the record created from a loaded item."""
+
+    @classmethod
+    def mark(cls, dump, index, status, item_id=None, error=None,
+             record_id=None, commit=True):
+        """Record the status of an item.
+
+        :param dump: Absolute path of the dump file.
+        :param index: Position of the item in the dump file.
+        :param status: Status of the item.
+        :type status: :class:`LoadStatus`
+        :param item_id: Identifier of the item.
+        :param error: Error message of a failed item.
+        :param record_id: UUID of the record created from the item.
+        :param commit: If ``False`` the status is only added to the current
+            transaction, to be committed by the caller.
+        """
+        db.session.merge(cls(
+            dump=dump,
+            item_index=index,
+            item_id=None if item_id is None else str(item_id),
+            status=status,
+            error=error,
+            record_id=record_id,
+        ))
+        if commit:
+            db.session.commit()
+
+    @classmethod
+    def succeeded(cls, dump):
+        """Get the items of a dump file which have been loaded.
+
+        :param dump: Absolute path of the dump file.
+        :returns: Dictionary mapping the position of each loaded item to its
+            identifier.
+        """
+        q = db.session.query(cls.item_index, cls.item_id).filter_by(
+            dump=dump, status=LoadStatus.SUCCEEDED)
+        return dict(q)
+
+    @classmethod
+    def succeeded_records(cls, dumps=None):
+        """Get the UUIDs of the records loaded from dump files.
+
+        :param dumps: Absolute paths of the dump files. By default the records
+            loaded from all dump files are returned.
+        :returns: List of record UUIDs.
+        """
+        q = db.session.query(cls.record_id).filter(
+            cls.status == LoadStatus.SUCCEEDED,
+            cls.record_id.isnot(None),
+        )
+        if dumps:
+            q = q.filter(cls.dump.in_(dumps))
+        return [row.record_id for row in q.order_by(cls.dump, cls.item_index)]
@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Streaming reader for JSON dump files.
+
+The legacy dumper writes each chunk as a single JSON array (``[{...},
+{...}]``). Instead of loading the whole array with ``json.load``, the reader
+decodes one item at a time, so that memory usage only depends on the size of
+the largest item and the caller can start working on the first item as soon
+as it has been read.
+
+Dump files can also be memory-mapped (see :class:`MappedDump`), so that
+single items are read without decoding anything else and so that the
+processes of a host share the page cache of the dump files.
+"""
+
+from __future__ import absolute_import, print_function
+
+import codecs
+import json
+import mmap
+import os
+import re
+from collections import OrderedDict
+from numbers import Number
+
+from six import string_types, text_type
+
+READ_SIZE = 64 * 1024
+"""Number of bytes read from the dump file at once."""
+
+_WHITESPACE = u' \t\n\r'
+_WHITESPACE_BYTES = b' \t\n\r'
+
+_STRUCTURE = re.compile(br'["\[\]{},]')
+"""Characters delimiting the items of a JSON array outside of strings."""
+
+_STRING_END = re.compile(br'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+"""Rest of a JSON string, up to and including its closing quote.
+
+The runs of plain characters are matched at once, instead of backtracking
+through an alternative for each character.
+"""
+
+_PLAIN_ID = re.compile(r'^[A-Za-z0-9_.:-]+$')
+"""Identifiers which are written verbatim in JSON."""
+
+_decoder = json.JSONDecoder()
+
+ITEM_IDS = {
+    'recid': lambda item: item.get('recid'),
+    'depid': lambda item: item['_p']['id'],
+    'id': lambda item: item.get('id'),
+}
+"""Functions returning the identifier of a dump item, by identifier kind."""
+
+INDEX_SUFFIX = '.idx'
+"""Suffix of the offset index file of a dump file."""
+
+
+class _DumpBuffer(object):
+    """Buffer of decoded text keeping track of its byte offset in the file."""
+
+    def __init__(self, fp, read_size):
+        """Initialize buffer."""
+        self.fp = fp
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = u''
+        self.offset = 0
+        self.eof = False
+
+    def read(self):
+        """Read more data from the file.
+
+        The read size grows with the buffer, so that a large item is not
+        decoded over and over again for each small read.
+
+        :returns: ``False`` if the end of the file has been reached.
+        """
+        if self.eof:
+            return False
+        data = self.fp.read(max(self.read_size, len(self.buf)))
+        if isinstance(data, text_type):
+            data = data.encode('utf-8')
+        self.eof = not data
+        self.buf += self.decoder.decode(data, final=self.eof)
+        return not self.eof
+
+    def consume(self, length, nbytes=None):
+        """Drop the first ``length`` characters of the buffer."""
+        if nbytes is None:
+            nbytes = len(self.buf[:length].encode('utf-8'))
+        self.offset += nbytes
+        self.buf = self.buf[length:]
+
+    def peek(self):
+        """Get the next non-whitespace character (``None`` at end of file)."""
+        while True:
+            stripped = self.buf.lstrip(_WHITESPACE)
+            self.consume(len(self.buf) - len(stripped))
+            if self.buf:
+                return self.buf[0]
+            if not self.read():
+                return None
+
+    def decode(self):
+        """Decode the next JSON value from the buffer.
+
+        :returns: A tuple ``(offset, length, value)``.
+        """
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf)
+            except ValueError:
+                if self.read():
+                    continue
+                raise
+            # A number at the end of the buffer might not be complete yet.
+            if end == len(self.buf) and isinstance(value, Number) and \
+                    self.read():
+                continue
+            offset = self.offset
+            length = len(self.buf[:end].encode('utf-8'))
+            self.consume(end, nbytes=length)
+            return offset, length, value
+
+
+def dump_size(fp):
+    """Get the size in bytes of an open dump file.
+
+    :param fp: Open dump file.
+    :returns: Size of the file or ``0`` if it cannot be determined (e.g. when
+        reading from a pipe).
+    """
+    try:
+        return os.fstat(fp.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def iter_dump(fp, read_size=READ_SIZE):
+    """Iterate over the items of a JSON array dump file.
+
+    Items are yielded as soon as they have been decoded, together with their
+    position in the file, which makes it possible to report progress in bytes
+    and to seek directly to a given item later on.
+
+    :param fp: Dump file, preferably opened in binary mode.
+    :param read_size: Number of bytes read from the file at once.
+    :returns: Iterator of ``(offset, length, item)`` tuples, where ``offset``
+        and ``length`` are the byte position and size of the item in the file.
+    """
+    buf = _DumpBuffer(fp, read_size)
+    if buf.peek() != u'[':
+        raise ValueError('Dump file does not contain a JSON array.')
+    buf.consume(1)
+
+    first = True
+    while True:
+        char = buf.peek()
+        if char is None:
+            raise ValueError('Unexpected end of dump file.')
+        if char == u']':
+            return
+        if not first:
+            if char != u',':
+                raise ValueError(
+                    'Expected "," at byte {0}.'.format(buf.offset))
+            buf.consume(1)
+            if buf.peek() == u']':
+                return
+        first = False
+        yield buf.decode()
+
+
+def iter_dump_items(fp, read_size=READ_SIZE):
+    """Iterate over the items of a JSON array dump file.
+
+    :param fp: Dump file, preferably opened in binary mode.
+    :param read_size: Number of bytes read from the file at once.
+    :returns: Iterator of items.
+    """
+    for _, _, item in iter_dump(fp, read_size=read_size):
+        yield item
+
+
+def dump_ref(path, offset, length):
+    """Create a reference to an item of a dump file.
+
+    The reference can be sent to a worker instead of the item itself (see
+    :func:`resolve_dump_ref`), provided that the dump file can be read by the
+    worker at the same path.
+
+    :param path: Absolute path of the dump file.
+    :param offset: Byte position of the item in the file.
+    :param length: Size in bytes of the item.
+    :returns: Dictionary referencing the item.
+    """
+    return {'$dump': path, 'offset': offset, 'length': length}
+
+
+def is_dump_ref(data):
+    """Check if data is a reference to a dump item (see :func:`dump_ref`)."""
+    return isinstance(data, dict) and '$dump' in data
+
+
+def read_dump_ref(ref):
+    """Read the item referenced by a dump reference.
+
+    The dump file is memory-mapped once per process (see
+    :func:`mapped_dump`), so that the workers of a host share it.
+
+    :param ref: Reference created with :func:`dump_ref`.
+    :returns: The item.
+    """
+    return mapped_dump(ref['$dump']).item(ref['offset'], ref['length'])
+
+
+def resolve_dump_ref(data):
+    """Get a dump item from a reference to it or from the item itself.
+
+    :param data: Dump item or reference created with :func:`dump_ref`.
+    :returns: The item.
+    """
+    return read_dump_ref(data) if is_dump_ref(data) else data
+
+
+def guess_item_id(item):
+    """Guess the kind of identifier of the items of a dump.
+
+    :param item: Item of the dump.
+    :returns: Key of :data:`ITEM_IDS`.
+    """
+    if 'recid' in item:
+        return 'recid'
+    if '_p' in item:
+        return 'depid'
+    return 'id'
+
+
+def index_path(path):
+    """Get the path of the offset index of a dump file."""
+    return path + INDEX_SUFFIX
+
+
+def write_index(fp, key=None, read_size=READ_SIZE):
+    """Write the offset index of a dump file.
+
+    The index is written next to the dump file (see :func:`index_path`) and
+    maps the identifier of each item to its byte position and size, so that
+    a single item can be read without scanning the dump (see
+    :func:`find_item`). The position and size of all the items are kept in
+    the order of the dump as well, including the items whose identifier is
+    missing or duplicated (see :meth:`MappedDump.offsets`).
+
+    :param fp: Dump file opened in binary mode.
+    :param key: Kind of identifier of the items (see :data:`ITEM_IDS`). By
+        default it is guessed from the first item.
+    :param read_size: Number of bytes read from the file at once.
+    :returns: Number of indexed items.
+    """
+    items, offsets = {}, []
+    for offset, length, item in iter_dump(fp, read_size=read_size):
+        key = key or guess_item_id(item)
+        items[str(ITEM_IDS[key](item))] = [offset, length]
+        offsets.append([offset, length])
+    stat = os.fstat(fp.fileno())
+    index = dict(key=key, size=stat.st_size, mtime=stat.st_mtime,
+                 items=items, offsets=offsets)
+    with open(index_path(fp.name), 'w') as out:
+        json.dump(index, out, separators=(',', ':'))
+    return len(items)
+
+
+def read_index(path):
+    """Read the offset index of a dump file.
+
+    :param path: Path of the dump file.
+    :returns: The index (see :func:`write_index`), or ``None`` if there is no
+        index or if the dump file has been modified since it was indexed.
+    """
+    try:
+        with open(index_path(path)) as fp:
+            index = json.load(fp)
+        stat = os.stat(path)
+    except (IOError, OSError, ValueError):
+        return None
+    if index.get('size') != stat.st_size or \
+            index.get('mtime') != stat.st_mtime:
+        return None
+    return index
+
+
+def find_item(fp, item_id, key, read_size=READ_SIZE):
+    """Find a single item of a dump file.
+
+    If the dump file has an up-to-date offset index for the same kind of
+    identifier, the item is read directly. Otherwise the dump is scanned (see
+    :meth:`MappedDump.find`).
+
+    :param fp: Dump file opened in binary mode.
+    :param item_id: Identifier of the item.
+    :param key: Kind of identifier (see :data:`ITEM_IDS`).
+    :param read_size: Number of bytes read from the file at once.
+    :returns: The item, or ``None`` if the dump does not contain it.
+    """
+    item_id = str(item_id)
+    name = getattr(fp, 'name', None)
+    if isinstance(name, string_types) and os.path.isfile(name):
+        with MappedDump(name) as dump:
+            return dump.find(item_id, key)
+
+    for item in iter_dump_items(fp, read_size=read_size):
+        if str(ITEM_IDS[key](item)) == item_id:
+            return item
+    return None
+
+
+def _strip(buf, start, end):
+    """Get the position and size of a part of a buffer without whitespace."""
+    while start < end and buf[start:start + 1] in _WHITESPACE_BYTES:
+        start += 1
+    while end > start and buf[end - 1:end] in _WHITESPACE_BYTES:
+        end -= 1
+    return start, end - start
+
+
+def scan_dump(buf):
+    """Find the items of a JSON array dump without decoding them.
+
+    Only the brackets, braces, commas and strings are looked at, which is
+    much faster than decoding the items and does not create any objects.
+
+    :param buf: Content of the dump file (e.g. a memory map).
+    :returns: Iterator of ``(offset, length)`` tuples, the byte position and
+        size of each item.
+    """
+    start, _ = _strip(buf, 0, len(buf))
+    if buf[start:start + 1] != b'[':
+        raise ValueError('Dump file does not contain a JSON array.')
+    pos = start = start + 1
+    depth = 1
+    while True:
+        match = _STRUCTURE.search(buf, pos)
+        if match is None:
+            raise ValueError('Unexpected end of dump file.')
+        char, pos = match.group(), match.end()
+        if char == b'"':
+            string = _STRING_END.match(buf, pos)
+            if string is None:
+                raise ValueError('Unexpected end of dump file.')
+            pos = string.end()
+        elif char in (b'[', b'{'):
+            depth += 1
+        elif char in (b']', b'}'):
+            depth -= 1
+            if depth == 0:
+                offset, length = _strip(buf, start, match.start())
+                if length:
+                    yield offset, length
+                return
+        elif depth == 1:
+            offset, length = _strip(buf, start, match.start())
+            if not length:
+                raise ValueError(
+                    'Unexpected "," at byte {0}.'.format(match.start()))
+            yield offset, length
+            start = pos
+
+
+class MappedDump(object):
+    """Memory-mapped dump file.
+
+    The items are read from the memory map, which is shared with the other
+    processes mapping the same file, and only the requested items are
+    decoded.
+    """
+
+    def __init__(self, path):
+        """Map a dump file.
+
+        :param path: Path of the dump file.
+        """
+        self.path = path
+        with open(path, 'rb') as fp:
+            self.stat = os.fstat(fp.fileno())
+            # An empty file cannot be mapped.
+            self.map = mmap.mmap(
+                fp.fileno(), 0, access=mmap.ACCESS_READ
+            ) if self.stat.st_size else b''
+
+    def close(self):
+        """Unmap the dump file."""
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+    def __enter__(self):
+        """Use the dump in a ``with`` statement."""
+        return self
+
+    def __exit__(self, *args):
+        """Unmap the dump file."""
+        self.close()
+
+    def is_stale(self):
+        """Check if the dump file has been modified since it was mapped."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_ino, stat.st_size, stat.st_mtime) != (
+            self.stat.st_ino, self.stat.st_size, self.stat.st_mtime)
+
+    def raw(self, offset, length):
+        """Get the encoded JSON of an item.
+
+        :param offset: Byte position of the item.
+        :param length: Size in bytes of the item.
+        """
+        return self.map[offset:offset + length]
+
+    def item(self, offset, length):
+        """Decode an item.
+
+        :param offset: Byte position of the item.
+        :param length: Size in bytes of the item.
+        """
+        return json.loads(self.raw(offset, length).decode('utf-8'))
+
+    def offsets(self):
+        """Get the position and size of each item.
+
+        :returns: List of ``(offset, length)`` tuples, from the offset index
+            if it is up to date or by scanning the dump otherwise.
+        """
+        index = read_index(self.path)
+        if index is not None and 'offsets' in index:
+            return [tuple(entry) for entry in index['offsets']]
+        return list(scan_dump(self.map))
+
+    def __iter__(self):
+        """Iterate over the items like :func:`iter_dump`."""
+        for offset, length in scan_dump(self.map):
+            yield offset, length, self.item(offset, length)
+
+    def find(self, item_id, key):
+        """Find a single item (see :func:`find_item`).
+
+        Without an offset index, only the items containing the identifier
+        are decoded.
+
+        :param item_id: Identifier of the item.
+        :param key: Kind of identifier (see :data:`ITEM_IDS`).
+        :returns: The item, or ``None`` if the dump does not contain it.
+        """
+        item_id = str(item_id)
+        index = read_index(self.path)
+        if index is not None and index['key'] == key:
+            entry = index['items'].get(item_id)
+            return None if entry is None else self.item(*entry)
+
+        # Identifiers with special characters might be escaped in the JSON.
+        needle = item_id.encode('utf-8') \
+            if _PLAIN_ID.match(item_id) else b''
+        for offset, length in scan_dump(self.map):
+            if needle not in self.raw(offset, length):
+                continue
+            item = self.item(offset, length)
+            if str(ITEM_IDS[key](item)) == item_id:
+                return item
+        return None
+
+
+MAPPED_DUMPS_SIZE = 16
+"""Number of dump files kept memory-mapped by a process."""
+
+_mapped_dumps = OrderedDict()
+"""Memory maps of the dump files read by the current process, least
+recently used first."""
+
+
+def mapped_dump(path):
+    """Get the memory map of a dump file.
+
+    The map is kept open for the following calls, until the file changes or
+    until :data:`MAPPED_DUMPS_SIZE` other dump files have been used since.
+
+    :param path: Path of the dump file.
+    :returns: A :class:`MappedDump`.
+    """
+    dump = _mapped_dumps.pop(path, None)
+    if dump is not None and dump.is_stale():
+        dump.close()
+        dump = None
+    if dump is None:
+        dump = MappedDump(path)
+        while len(_mapped_dumps) >= MAPPED_DUMPS_SIZE:
+            _mapped_dumps.popitem(last=False)[1].close()
+    _mapped_dumps[path] = dump
+    return dump
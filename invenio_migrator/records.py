@@ -26,11 +26,14 @@
 
 from __future__ import absolute_import, print_function
 
+import json
+import uuid
 from os.path import splitext
 
 import arrow
 from dojson.contrib.marc21 import marc21
 from dojson.contrib.marc21.utils import create_record
+from flask import current_app
 from invenio_db import db
 from invenio_files_rest.models import Bucket, BucketTag, FileInstance, \
     ObjectVersion
@@ -39,14 +42,105 @@ from invenio_pidstore.models import PersistentIdentifier, PIDStatus, \
     RecordIdentifier
 from invenio_pidstore.resolver import Resolver
 from invenio_records.api import Record
+from invenio_records.errors import MissingModelError
+from invenio_records.models import RecordMetadata
+from invenio_records.signals import after_record_insert, before_record_insert
 from invenio_records_files.models import RecordsBuckets
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy_continuum import version_class
 from werkzeug.utils import cached_property
 
-from .utils import disable_timestamp
+from .cache import to_json, transaction_date_key
+from .utils import bulk_create_objects, create_transactions, \
+    disable_timestamp, existing_pids, new_version, version_rows, \
+    versioning_manager
+
+
+class MigrationRecord(Record):
+    """Record API without signals and validation.
+
+    Used instead of ``invenio_records.api.Record`` when
+    ``MIGRATOR_RECORDS_DEFER_HOOKS`` is enabled, so that the receivers of
+    the record signals (e.g. indexing) and the JSON schema validation do not
+    run for each revision of each migrated record. The records can be
+    validated afterwards in bulk (see ``invenio dumps validaterecords``).
+    """
+
+    @classmethod
+    def create(cls, data, id_=None, **kwargs):
+        """Create a new record instance and store it in the database."""
+        with db.session.begin_nested():
+            record = cls(data)
+            record.model = RecordMetadata(id=id_, json=record)
+            db.session.add(record.model)
+        return record
+
+    def commit(self, **kwargs):
+        """Store changes of the current record instance in the database."""
+        if self.model is None or self.model.json is None:
+            raise MissingModelError()
+
+        with db.session.begin_nested():
+            self.model.json = dict(self)
+            flag_modified(self.model, 'json')
+            db.session.merge(self.model)
+        return self
+
+    def delete(self, force=False):
+        """Delete a record."""
+        if self.model is None:
+            raise MissingModelError()
+
+        with db.session.begin_nested():
+            if force:
+                db.session.delete(self.model)
+            else:
+                self.model.json = None
+                db.session.merge(self.model)
+        return self
+
+
+def record_cls():
+    """Get the record API class used to store migrated records."""
+    if current_app.config['MIGRATOR_RECORDS_DEFER_HOOKS']:
+        return MigrationRecord
+    return Record
+
+
+SINGLE_TRANSACTION = 'invenio-migrator.single-transaction'
+"""Key of the session info flag to only flush the loading steps."""
 
 
 class RecordDumpLoader(object):
-    """Migrate a record."""
+    """Migrate a record.
+
+    By default each step of the loading (record revisions, persistent
+    identifiers, buckets and files) is committed separately. If
+    ``MIGRATOR_RECORDS_SINGLE_TRANSACTION`` is enabled, the steps are only
+    flushed and the whole dump is committed once by the caller. The same
+    applies while the session is flagged with :data:`SINGLE_TRANSACTION`,
+    e.g. when a batch of dumps is loaded within a single transaction.
+
+    By default each revision of a record is stored with an update of the
+    record, from which SQLAlchemy-Continuum creates its version. If
+    ``MIGRATOR_RECORDS_BULK_VERSIONS`` is enabled, the version history is
+    built from the revisions of the dump instead and inserted at once.
+    """
+
+    @classmethod
+    def commit(cls, revision=False):
+        """Commit the changes of a loading step.
+
+        :param revision: If ``True`` the step stored a record revision, which
+            must result in a new version of the record.
+        """
+        if current_app.config['MIGRATOR_RECORDS_SINGLE_TRANSACTION'] or \
+                db.session.info.get(SINGLE_TRANSACTION):
+            db.session.flush()
+            if revision:
+                new_version(db.session)
+        else:
+            db.session.commit()
 
     @classmethod
     def create(cls, dump):
@@ -61,18 +155,27 @@ class RecordDumpLoader(object):
                     'recid', dump.recid,
                     status=PIDStatus.RESERVED
                 )
-                db.session.commit()
+                cls.commit()
             return None
 
         dump.prepare_revisions()
+        if current_app.config['MIGRATOR_RECORDS_SKIP_IDENTICAL_REVISIONS']:
+            dump.skip_identical_revisions()
         dump.prepare_pids()
         dump.prepare_files()
 
+        if current_app.config['MIGRATOR_RECORDS_DELETED_FAST_PATH'] and \
+                not dump.record and dump.is_deleted():
+            return cls.create_deleted_record(dump)
+
         # Create or update?
         existing_files = []
         if dump.record:
             existing_files = dump.record.get('_files', [])
-            record = cls.update_record(revisions=dump.revisions,
+            revisions = dump.revisions
+            if current_app.config['MIGRATOR_RECORDS_INCREMENTAL_UPDATE']:
+                revisions = dump.revisions_since(dump.record.model.updated)
+            record = cls.update_record(revisions=revisions,
                                        created=dump.created,
                                        record=dump.record)
             pids = dump.missing_pids
@@ -98,10 +201,14 @@ class RecordDumpLoader(object):
         """Create a new record from dump."""
         # Reserve record identifier, create record and recid pid in one
         # operation.
-        timestamp, data = dump.latest
-        record = Record.create(data)
-        record.model.created = dump.created.replace(tzinfo=None)
-        record.model.updated = timestamp.replace(tzinfo=None)
+        bulk_versions = current_app.config['MIGRATOR_RECORDS_BULK_VERSIONS']
+        if bulk_versions:
+            record = cls.insert_record(dump.revisions, dump.created)
+        else:
+            timestamp, data = dump.latest
+            record = record_cls().create(data)
+            record.model.created = dump.created.replace(tzinfo=None)
+            record.model.updated = timestamp.replace(tzinfo=None)
         RecordIdentifier.insert(dump.recid)
         PersistentIdentifier.create(
             pid_type='recid',
@@ -110,20 +217,143 @@ class RecordDumpLoader(object):
             object_uuid=str(record.id),
             status=PIDStatus.REGISTERED
         )
-        db.session.commit()
+        cls.commit(revision=True)
+        if bulk_versions:
+            return record
         return cls.update_record(revisions=dump.rest, record=record,
                                  created=dump.created)
 
+    @classmethod
+    def insert_record(cls, revisions, created):
+        """Insert a new record with the version history of all its revisions.
+
+        The record signals are sent and the latest revision is validated as
+        with ``invenio_records.api.Record.create`` (unless
+        ``MIGRATOR_RECORDS_DEFER_HOOKS`` is enabled).
+
+        :param revisions: List of ``(updated, json)`` of each revision.
+        :param created: Creation date of the record.
+        :returns: The new record, in its latest revision.
+        """
+        timestamp, data = revisions[-1]
+        record = record_cls()(data)
+        hooks = not current_app.config['MIGRATOR_RECORDS_DEFER_HOOKS']
+        if hooks:
+            before_record_insert.send(
+                current_app._get_current_object(), record=record)
+            record.validate()
+
+        record_id = uuid.uuid4()
+        db.session.execute(RecordMetadata.__table__.insert(), [dict(
+            id=record_id,
+            json=record,
+            created=created.replace(tzinfo=None),
+            updated=timestamp.replace(tzinfo=None),
+            version_id=len(revisions),
+        )])
+        cls.insert_versions(record_id, created, revisions)
+        record.model = RecordMetadata.query.get(record_id)
+
+        if hooks:
+            after_record_insert.send(
+                current_app._get_current_object(), record=record)
+        return record
+
+    @classmethod
+    def insert_versions(cls, record_id, created, revisions, version_id=0):
+        """Insert the versions of revisions of a record at once.
+
+        Instead of letting SQLAlchemy-Continuum create a version for each
+        update of the record, the version rows are built in memory and
+        inserted with a single statement, each with its own transaction.
+
+        :param record_id: Identifier of the record.
+        :param created: Creation date of the record.
+        :param revisions: List of ``(updated, json)`` of each revision.
+        :param version_id: Version of the record before the revisions, or
+            ``0`` for a new record.
+        """
+        if versioning_manager() is None or not revisions:
+            return
+        table = version_class(RecordMetadata).__table__
+        transaction_ids = create_transactions(len(revisions))
+        if version_id:
+            # Close the validity of the current version.
+            db.session.execute(table.update().where(
+                table.c.id == record_id
+            ).where(
+                table.c.end_transaction_id.is_(None)
+            ).values(end_transaction_id=transaction_ids[0]))
+        db.session.execute(table.insert(), version_rows(
+            record_id, created, revisions, transaction_ids,
+            version_id=version_id))
+
+    @classmethod
+    @disable_timestamp
+    def create_deleted_record(cls, dump):
+        """Create a new record from dump, directly in deleted state.
+
+        Only the latest revision of the record is stored and its persistent
+        identifiers are created in deleted state. The files are only created
+        if ``MIGRATOR_RECORDS_DELETED_FILES`` is enabled.
+        """
+        timestamp, data = dump.revisions[-1]
+        record = record_cls().create(data)
+        record.model.created = dump.created.replace(tzinfo=None)
+        record.model.updated = timestamp.replace(tzinfo=None)
+        RecordIdentifier.insert(dump.recid)
+        PersistentIdentifier.create(
+            pid_type='recid',
+            pid_value=str(dump.recid),
+            object_type='rec',
+            object_uuid=str(record.id),
+            status=PIDStatus.DELETED
+        )
+        for p in dump.pids:
+            PersistentIdentifier.create(
+                pid_type=p.pid_type,
+                pid_value=p.pid_value,
+                pid_provider=p.provider.pid_provider if p.provider else None,
+                object_type='rec',
+                object_uuid=record.id,
+                status=PIDStatus.DELETED,
+            )
+        if dump.files and current_app.config['MIGRATOR_RECORDS_DELETED_FILES']:
+            cls.create_files(record, dump.files, [])
+        record.delete()
+        cls.delete_buckets(record)
+        cls.commit(revision=True)
+        return record
+
     @classmethod
     @disable_timestamp
     def update_record(cls, revisions, created, record):
         """Update an existing record."""
+        if current_app.config['MIGRATOR_RECORDS_BULK_VERSIONS'] and \
+                revisions:
+            model = record.model
+            db.session.flush()
+            timestamp, data = revisions[-1]
+            db.session.execute(RecordMetadata.__table__.update().where(
+                RecordMetadata.__table__.c.id == model.id
+            ).values(
+                json=data,
+                created=created.replace(tzinfo=None),
+                updated=timestamp.replace(tzinfo=None),
+                version_id=model.version_id + len(revisions),
+            ))
+            cls.insert_versions(model.id, created, revisions,
+                                version_id=model.version_id)
+            db.session.expire(model)
+            cls.commit(revision=True)
+            return record_cls()(model.json, model=model)
+
         for timestamp, revision in revisions:
             record.model.json = revision
             record.model.created = created.replace(tzinfo=None)
             record.model.updated = timestamp.replace(tzinfo=None)
-            db.session.commit()
-        return Record(record.model.json, model=record.model)
+            cls.commit(revision=True)
+        return record_cls()(record.model.json, model=record.model)
 
     @classmethod
     def create_pids(cls, record_uuid, pids):
@@ -137,9 +367,10 @@ class RecordDumpLoader(object):
                 object_uuid=record_uuid,
                 status=PIDStatus.REGISTERED,
             )
-        db.session.commit()
+        cls.commit()
 
     @classmethod
+    @disable_timestamp
     def delete_record(cls, record):
         """Delete a record and it's persistent identifiers."""
         record.delete()
@@ -147,9 +378,10 @@ class RecordDumpLoader(object):
             object_type='rec', object_uuid=record.id,
         ).update({PersistentIdentifier.status: PIDStatus.DELETED})
         cls.delete_buckets(record)
-        db.session.commit()
+        cls.commit(revision=True)
 
     @classmethod
+    @disable_timestamp
     def create_files(cls, record, files, existing_files):
         """Create files.
 
@@ -167,34 +399,58 @@ class RecordDumpLoader(object):
             b = Bucket.create()
             BucketTag.create(b, 'record', str(record.id))
             default_bucket = str(b.id)
-            db.session.commit()
+            cls.commit()
         else:
             b = Bucket.get(default_bucket)
 
-        record['_files'] = []
-        for key, meta in files.items():
-            obj = cls.create_file(b, key, meta)
-            ext = splitext(obj.key)[1].lower()
-            if ext.startswith('.'):
-                ext = ext[1:]
-            record['_files'].append(dict(
-                bucket=str(obj.bucket.id),
-                key=obj.key,
-                version_id=str(obj.version_id),
-                size=obj.file.size,
-                checksum=obj.file.checksum,
-                type=ext,
-            ))
-        db.session.add(
-            RecordsBuckets(record_id=record.id, bucket_id=b.id)
-        )
-        record.commit()
-        db.session.commit()
+        # Keep the files which did not change since they were last loaded.
+        loaded = {}
+        if current_app.config['MIGRATOR_RECORDS_INCREMENTAL_UPDATE']:
+            loaded = dict(
+                (f['key'], f) for f in existing_files
+                if f['key'] in files and f.get('checksum') ==
+                'md5:{0}'.format(files[f['key']][-1]['checksum'])
+            )
+        new_files = dict(
+            (key, meta) for key, meta in files.items() if key not in loaded)
+
+        if current_app.config['MIGRATOR_FILES_BULK_INSERT']:
+            heads = cls.create_objects(b, new_files)
+        else:
+            heads = {}
+            for key, meta in new_files.items():
+                obj = cls.create_file(b, key, meta)
+                heads[key] = dict(
+                    bucket_id=obj.bucket.id,
+                    version_id=obj.version_id,
+                    size=obj.file.size,
+                    checksum=obj.file.checksum,
+                )
+
+        record_files = []
+        for key in files:
+            if key in loaded:
+                record_files.append(loaded[key])
+                continue
+            record_files.append(cls.file_entry(key, heads[key]))
+        if not RecordsBuckets.query.filter_by(
+                record_id=record.id, bucket_id=b.id).count():
+            db.session.add(
+                RecordsBuckets(record_id=record.id, bucket_id=b.id)
+            )
+        # Compare with the record as updated, whose revisions from the dump
+        # do not contain the files.
+        if record_files != record.get('_files', []):
+            record['_files'] = record_files
+            record.commit()
+            cls.commit(revision=True)
+        else:
+            cls.commit()
 
         return [b]
 
     @classmethod
-    def create_file(self, bucket, key, file_versions):
+    def create_file(cls, bucket, key, file_versions):
         """Create a single file with all versions."""
         objs = []
         for file_ver in file_versions:
@@ -204,14 +460,68 @@ class RecordDumpLoader(object):
                 'md5:{0}'.format(file_ver['checksum']),
             )
             obj = ObjectVersion.create(bucket, key).set_file(f)
+            bucket.size += file_ver['size']
             obj.created = arrow.get(
                 file_ver['creation_date']).datetime.replace(tzinfo=None)
             objs.append(obj)
 
         # Set head version
-        db.session.commit()
+        cls.commit()
         return objs[-1]
 
+    @classmethod
+    def create_objects(cls, bucket, files):
+        """Create all files with all versions using bulk inserts.
+
+        :param bucket: Bucket of the record.
+        :param files: Dictionary mapping each key to its file versions.
+        :returns: Dictionary mapping each key to its head version.
+        """
+        objects = bulk_create_objects(bucket, cls.file_objects(files))
+        cls.commit()
+        return dict((o['key'], o) for o in objects if o['is_head'])
+
+    @classmethod
+    def file_objects(cls, files):
+        """Get the objects to create for the files of a dump.
+
+        :param files: Dictionary mapping each key to its file versions.
+        :returns: List of objects (see
+            ``invenio_migrator.utils.object_rows``).
+        """
+        return [
+            dict(
+                key=key,
+                uri=file_ver['full_path'],
+                size=file_ver['size'],
+                checksum='md5:{0}'.format(file_ver['checksum']),
+                created=arrow.get(
+                    file_ver['creation_date']).datetime.replace(tzinfo=None),
+            )
+            for key, file_versions in files.items()
+            for file_ver in file_versions
+        ]
+
+    @classmethod
+    def file_entry(cls, key, head):
+        """Get the entry of a file in the ``_files`` key of a record.
+
+        :param key: Key of the file.
+        :param head: Dictionary with the ``bucket_id``, ``version_id``,
+            ``size`` and ``checksum`` of the head version of the file.
+        """
+        ext = splitext(key)[1].lower()
+        if ext.startswith('.'):
+            ext = ext[1:]
+        return dict(
+            bucket=str(head['bucket_id']),
+            key=key,
+            version_id=str(head['version_id']),
+            size=head['size'],
+            checksum=head['checksum'],
+            type=ext,
+        )
+
     @classmethod
     def delete_buckets(cls, record):
         """Delete the bucket."""
@@ -237,16 +547,24 @@ class RecordDump(object):
     """
 
     def __init__(self, data, source_type='marcxml', latest_only=False,
-                 pid_fetchers=None, dojson_model=marc21):
-        """Initialize class."""
+                 pid_fetchers=None, dojson_model=marc21,
+                 conversion_cache=None):
+        """Initialize class.
+
+        :param conversion_cache: Cache of MARCXML conversions
+            (:class:`invenio_migrator.cache.ConversionCache`).
+        """
         self.resolver = Resolver(
             pid_type='recid', object_type='rec', getter=Record.get_record)
         self.data = data
         self.source_type = source_type
         self.latest_only = latest_only
         self.dojson_model = dojson_model
+        self.conversion_cache = conversion_cache
         self.revisions = None
+        self._created = None
         self.pid_fetchers = pid_fetchers or []
+        self.existing_pids = None
 
     @cached_property
     def record(self):
@@ -258,25 +576,57 @@ class RecordDump(object):
 
     @cached_property
     def missing_pids(self):
-        """Filter persistent identifiers."""
-        missing = []
-        for p in self.pids:
-            try:
-                PersistentIdentifier.get(p.pid_type, p.pid_value)
-            except PIDDoesNotExistError:
-                missing.append(p)
-        return missing
+        """Filter persistent identifiers.
+
+        The persistent identifiers are looked up in bulk, unless they have
+        already been looked up for several dumps at once with
+        :meth:`resolve_pids`.
+        """
+        existing = self.existing_pids
+        if existing is None:
+            existing = existing_pids(
+                (p.pid_type, p.pid_value) for p in self.pids)
+        return [p for p in self.pids
+                if (p.pid_type, p.pid_value) not in existing]
+
+    @classmethod
+    def resolve_pids(cls, dumps):
+        """Look up the existing persistent identifiers of several dumps.
+
+        A single lookup is made for the persistent identifiers of all dumps,
+        which must have been prepared with :meth:`prepare_pids`.
+
+        :param dumps: List of record dumps.
+        """
+        existing = existing_pids(
+            (p.pid_type, p.pid_value) for d in dumps for p in d.pids)
+        for d in dumps:
+            d.existing_pids = existing
 
     @cached_property
     def recid(self):
         """Get recid."""
         return self.data['recid']
 
+    def convert_revision(self, data):
+        """Convert the MARCXML of a revision with the DoJSON model.
+
+        The conversion has JSON types, as when it comes from the conversion
+        cache (see :func:`invenio_migrator.cache.to_json`).
+
+        :param data: Revision from the dump.
+        :returns: Converted revision.
+        """
+        if self.conversion_cache is not None:
+            return self.conversion_cache.convert(
+                data['marcxml'], self.dojson_model)
+        return to_json(self.dojson_model.do(create_record(data['marcxml'])))
+
     def _prepare_revision(self, data):
         dt = arrow.get(data['modification_datetime']).datetime
 
         if self.source_type == 'marcxml':
-            val = self.dojson_model.do(create_record(data['marcxml']))
+            val = self.convert_revision(data)
         else:
             val = data['json']
 
@@ -295,6 +645,43 @@ class RecordDump(object):
         for i in it:
             self.revisions.append(self._prepare_revision(i))
 
+    def revisions_since(self, date):
+        """Get the revisions more recent than a date.
+
+        :param date: Naive UTC date, e.g. the last update of the stored
+            record.
+        :returns: List of revisions.
+        """
+        return [(dt, val) for dt, val in self.revisions
+                if dt.replace(tzinfo=None) > date]
+
+    def skip_identical_revisions(self):
+        """Collapse consecutive revisions with identical content.
+
+        A run of identical revisions is replaced by a single revision with the
+        date of the latest one, so that no new version is stored for a
+        revision which did not change the record. The creation date of the
+        record is kept.
+
+        The revisions are compared in their JSON form, without the date of the
+        latest transaction (``005``) of MARCXML revisions, which changes with
+        every legacy revision.
+        """
+        self._created = self.created
+        ignored = transaction_date_key(self.dojson_model) \
+            if self.source_type == 'marcxml' else None
+        revisions, last = [], None
+        for dt, val in self.revisions:
+            content = json.dumps(
+                dict((k, v) for k, v in val.items() if k != ignored),
+                sort_keys=True)
+            if revisions and content == last:
+                revisions[-1] = (dt, val)
+            else:
+                revisions.append((dt, val))
+            last = content
+        self.revisions = revisions
+
     def prepare_files(self):
         """Get files from data dump."""
         # Prepare files
@@ -322,6 +709,8 @@ class RecordDump(object):
     @property
     def created(self):
         """Get creation date."""
+        if self._created is not None:
+            return self._created
         return self.revisions[0][0]
 
     @property
@@ -32,10 +32,11 @@ from celery import shared_task
 from dateutil.parser import parse as iso2dt
 from invenio_db import db
 
-from .utils import iso2dt_or_none, logo_ext_wash
+from .utils import iso2dt_or_none, logo_ext_wash, with_ledger
 
 
 @shared_task()
+@with_ledger
 def load_community(data, logos_dir):
     """Load community from data dump.
 
@@ -70,6 +71,7 @@ def load_community(data, logos_dir):
 
 
 @shared_task()
+@with_ledger
 def load_featured(data):
     """Load community featuring from data dump.
 
@@ -29,26 +29,31 @@ import arrow
 
 from celery import shared_task
 from celery.utils.log import get_task_logger
+from flask import current_app
 from os.path import splitext
 
 
-from .utils import empty_str_if_none
+from .utils import empty_str_if_none, with_ledger
 from .errors import DepositMultipleRecids
 
 logger = get_task_logger(__name__)
 
 
 @shared_task()
+@with_ledger
 def load_deposit(data):
     """Load the raw JSON dump of the Deposition.
 
     Uses Record API in order to bypass all Deposit-specific initialization,
     which are to be done after the final stage of deposit migration.
 
-    :param data: Dictionary containing deposition data.
+    :param data: Dictionary containing deposition data, or reference to it
+        in the dump file (see :func:`invenio_migrator.reader.dump_ref`).
     :type data: dict
     """
     from invenio_db import db
+    from ..reader import resolve_dump_ref
+    data = resolve_dump_ref(data)
     deposit, dep_pid = create_record_and_pid(data)
     deposit = create_files_and_sip(deposit, dep_pid)
     db.session.commit()
@@ -63,11 +68,11 @@ def create_record_and_pid(data):
     :rtype: (`invenio_records.api.Record`,
              `invenio_pidstore.models.PersistentIdentifier`)
     """
-    from invenio_records.api import Record
     from invenio_pidstore.models import PersistentIdentifier, PIDStatus, \
         RecordIdentifier
+    from ..records import record_cls
 
-    deposit = Record.create(data=data)
+    deposit = record_cls().create(data=data)
 
     created = arrow.get(data['_p']['created']).datetime
     deposit.model.created = created.replace(tzinfo=None)
@@ -95,6 +100,7 @@ def create_files_and_sip(deposit, dep_pid):
     from invenio_files_rest.models import Bucket, FileInstance, ObjectVersion
     from invenio_records_files.models import RecordsBuckets
     from invenio_db import db
+    from ..utils import bulk_create_objects
     buc = Bucket.create()
     recbuc = RecordsBuckets(record_id=deposit.id, bucket_id=buc.id)
     db.session.add(recbuc)
@@ -146,30 +152,55 @@ def create_files_and_sip(deposit, dep_pid):
                 if RecordIdentifier.query.get(int(pre_recid)) is None:
                     RecordIdentifier.insert(int(pre_recid))
 
-    # Store the path -> FileInstance mappings for SIPFile creation later
+    # Store the path -> FileInstance ID mappings for SIPFile creation later
     dep_file_instances = list()
 
-    for file_ in files:
-        size = file_['size']
-        key = file_['name']
-        # Warning: Assumes all checksums are MD5!
-        checksum = 'md5:{0}'.format(file_['checksum'])
-        fi = FileInstance.create()
-        fi.set_uri(file_['path'], size, checksum)
-        ov = ObjectVersion.create(buc, key, _file_id=fi.id)
-        ext = splitext(ov.key)[1].lower()
+    if current_app.config['MIGRATOR_FILES_BULK_INSERT']:
+        objects = bulk_create_objects(buc, [
+            dict(
+                key=file_['name'],
+                uri=file_['path'],
+                size=file_['size'],
+                # Warning: Assumes all checksums are MD5!
+                checksum='md5:{0}'.format(file_['checksum']),
+            )
+            for file_ in files
+        ])
+    else:
+        objects = []
+        for file_ in files:
+            size = file_['size']
+            key = file_['name']
+            # Warning: Assumes all checksums are MD5!
+            checksum = 'md5:{0}'.format(file_['checksum'])
+            fi = FileInstance.create()
+            fi.set_uri(file_['path'], size, checksum)
+            ov = ObjectVersion.create(buc, key, _file_id=fi.id)
+            buc.size += size
+            objects.append(dict(
+                key=ov.key,
+                uri=file_['path'],
+                size=ov.file.size,
+                checksum=ov.file.checksum,
+                bucket_id=ov.bucket.id,
+                version_id=ov.version_id,
+                file_id=fi.id,
+            ))
+
+    for obj in objects:
+        ext = splitext(obj['key'])[1].lower()
         if ext.startswith('.'):
             ext = ext[1:]
         file_meta = dict(
-            bucket=str(ov.bucket.id),
-            key=ov.key,
-            checksum=ov.file.checksum,
-            size=ov.file.size,
-            version_id=str(ov.version_id),
+            bucket=str(obj['bucket_id']),
+            key=obj['key'],
+            checksum=obj['checksum'],
+            size=obj['size'],
+            version_id=str(obj['version_id']),
             type=ext,
         )
         deposit['_files'].append(file_meta)
-        dep_file_instances.append((file_['path'], fi))
+        dep_file_instances.append((obj['uri'], obj['file_id']))
 
     # Get a recid from SIP information
     recid = None
@@ -242,8 +273,8 @@ def create_files_and_sip(deposit, dep_pid):
                 if RecordIdentifier.query.get(int(recid)) is None:
                     RecordIdentifier.insert(int(recid))
         if idx == 0:
-            for fp, fi in dep_file_instances:
-                sipf = SIPFile(sip_id=sip.id, filepath=fp, file_id=fi.id)
+            for fp, file_id in dep_file_instances:
+                sipf = SIPFile(sip_id=sip.id, filepath=fp, file_id=file_id)
                 db.session.add(sipf)
     deposit.commit()
     return deposit
@@ -28,10 +28,11 @@ from __future__ import absolute_import, print_function
 
 from celery import shared_task
 
-from .utils import iso2dt_or_none, load_common
+from .utils import iso2dt_or_none, load_common, with_ledger
 
 
 @shared_task()
+@with_ledger
 def load_client(data):
     """Load the oauth2server client from data dump."""
     from invenio_oauth2server.models import Client
@@ -39,6 +40,7 @@ def load_client(data):
 
 
 @shared_task()
+@with_ledger
 def load_token(data):
     """Load the oauth2server token from data dump."""
     from invenio_oauth2server.models import Token
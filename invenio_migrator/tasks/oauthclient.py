@@ -28,10 +28,11 @@ from __future__ import absolute_import, print_function
 
 from celery import shared_task
 
-from .utils import load_common
+from .utils import load_common, with_ledger
 
 
 @shared_task()
+@with_ledger
 def load_remoteaccount(data):
     """Load the remote accounts from data dump.
 
@@ -43,6 +44,7 @@ def load_remoteaccount(data):
 
 
 @shared_task()
+@with_ledger
 def load_remotetoken(data):
     """Load the remote tokens from data dump.
 
@@ -54,6 +56,7 @@ def load_remotetoken(data):
 
 
 @shared_task()
+@with_ledger
 def load_userext(data):
     """Load the user identities from UserEXT dump.
 
@@ -27,31 +27,260 @@
 from __future__ import absolute_import, print_function
 
 from celery import shared_task
+from celery.utils.log import get_task_logger
 from invenio_db import db
+from invenio_records.models import RecordMetadata
+from jsonschema.exceptions import ValidationError
 
+from ..models import LoadLedger, LoadStatus
 from ..proxies import current_migrator
+from ..reader import is_dump_ref, resolve_dump_ref
+from ..records import SINGLE_TRANSACTION
+from ..utils import new_version, validate_record
 
+logger = get_task_logger(__name__)
 
-@shared_task()
-def import_record(data, source_type=None, latest_only=False):
-    """Migrate a record from a migration dump.
 
-    :param data: Dictionary for representing a single record and files.
-    :param source_type: Determines if the MARCXML or the JSON dump is used.
-        Default: ``marcxml``.
-    :param latest_only: Determine is only the latest revision should be loaded.
-    """
+def _record_dump(data, source_type=None, latest_only=False):
+    """Wrap the dump of a record."""
     source_type = source_type or 'marcxml'
     assert source_type in ['marcxml', 'json']
 
-    recorddump = current_migrator.records_dump_cls(
+    return current_migrator.records_dump_cls(
         data,
         source_type=source_type,
+        latest_only=latest_only,
         pid_fetchers=current_migrator.records_pid_fetchers,
+        conversion_cache=current_migrator.records_conversion_cache,
     )
+
+
+def _record_id(record):
+    """Get the UUID of a record created by the record dump loader."""
+    record_id = getattr(record, 'id', record)
+    return None if record_id is None else str(record_id)
+
+
+def _import_record(data, source_type=None, latest_only=False):
+    """Load a single record dump and commit it.
+
+    :returns: UUID of the record, or ``None`` if only its record identifier
+        has been reserved.
+    """
+    recorddump = _record_dump(
+        data, source_type=source_type, latest_only=latest_only)
     try:
-        current_migrator.records_dumploader_cls.create(recorddump)
+        record = current_migrator.records_dumploader_cls.create(recorddump)
         db.session.commit()
     except Exception:
         db.session.rollback()
         raise
+    return _record_id(record)
+
+
+def _dump_item_name(item):
+    """Name a record dump, or a reference to it, in the failed records."""
+    if is_dump_ref(item):
+        return '{0}@{1}'.format(item['$dump'], item['offset'])
+    return item.get('recid')
+
+
+def _import_failed(failed, recid, error, entry=None):
+    """Record a record of a batch which failed to load.
+
+    :param failed: List of the failed records of the batch.
+    :param recid: Record identifier of the failed record.
+    :param error: Exception raised by the record.
+    :param entry: Load ledger entry of the record.
+    """
+    logger.exception('Failed to import record {0}.'.format(recid))
+    failed.append(recid)
+    if entry:
+        LoadLedger.mark(status=LoadStatus.FAILED, error=str(error),
+                        commit=False, **entry)
+
+
+def _post_process(record_ids):
+    """Run the bulk post-processing task on loaded records.
+
+    A failure is only logged: the records are loaded and can be processed
+    again with ``invenio dumps postprocess``.
+    """
+    record_ids = [r for r in record_ids if r]
+    task = current_migrator.records_bulk_post_task
+    if not record_ids or task is None:
+        return
+    try:
+        task(record_ids)
+    except Exception:
+        logger.exception(
+            'Failed to post-process records {0}.'.format(record_ids))
+
+
+@shared_task()
+def import_record(data, source_type=None, latest_only=False, ledger=None):
+    """Migrate a record from a migration dump.
+
+    :param data: Dictionary for representing a single record and files, or
+        reference to it in the dump file (see
+        :func:`invenio_migrator.reader.dump_ref`).
+    :param source_type: Determines if the MARCXML or the JSON dump is used.
+        Default: ``marcxml``.
+    :param latest_only: Determine is only the latest revision should be loaded.
+    :param ledger: Load ledger entry of the record (see
+        :func:`invenio_migrator.tasks.utils.with_ledger`).
+    """
+    try:
+        record_id = _import_record(
+            resolve_dump_ref(data), source_type=source_type,
+            latest_only=latest_only)
+    except Exception as e:
+        if ledger:
+            LoadLedger.mark(status=LoadStatus.FAILED, error=str(e), **ledger)
+        raise
+    if ledger:
+        LoadLedger.mark(
+            status=LoadStatus.SUCCEEDED, record_id=record_id, **ledger)
+
+
+@shared_task()
+def import_records(data, source_type=None, latest_only=False, ledger=None):
+    """Migrate a batch of records from a migration dump.
+
+    All records of the batch are loaded by the same worker within a single
+    task and a single transaction, saving the broker round-trip, task and
+    commit overhead of each record. Each record is loaded within a savepoint:
+    a failing record is rolled back and logged, without affecting the other
+    records of the batch. The loaded records are then post-processed together
+    (see ``MIGRATOR_RECORDS_BULK_POST_TASK``).
+
+    If the record dump loader can load several dumps at once (i.e. it has a
+    ``create_all`` method, see
+    :class:`invenio_migrator.copyloader.RecordDumpCopyLoader`), the whole
+    batch is loaded with a single call and fails as a whole.
+
+    :param data: List of dictionaries, each representing a single record and
+        files, or references to them in the dump file (see
+        :func:`invenio_migrator.reader.dump_ref`).
+    :param source_type: Determines if the MARCXML or the JSON dump is used.
+        Default: ``marcxml``.
+    :param latest_only: Determine is only the latest revision should be loaded.
+    :param ledger: List of load ledger entries (see
+        :func:`invenio_migrator.tasks.utils.with_ledger`), one for each record
+        of the batch, in which the outcome of each record is recorded.
+    :returns: List of record identifiers which failed to load.
+    """
+    if hasattr(current_migrator.records_dumploader_cls, 'create_all'):
+        return _import_records_at_once(
+            data, source_type=source_type, latest_only=latest_only,
+            ledger=ledger)
+
+    loader = current_migrator.records_dumploader_cls
+    failed, loaded = [], []
+    db.session.info[SINGLE_TRANSACTION] = True
+    try:
+        for idx, item in enumerate(data):
+            entry = ledger[idx] if ledger else None
+            try:
+                item = resolve_dump_ref(item)
+            except Exception as e:
+                _import_failed(failed, _dump_item_name(item), e, entry)
+                continue
+            try:
+                with db.session.begin_nested():
+                    record = loader.create(_record_dump(
+                        item, source_type=source_type,
+                        latest_only=latest_only))
+            except Exception as e:
+                # The unit of work of the versioning refers to the rolled
+                # back transaction.
+                new_version(db.session)
+                _import_failed(failed, item.get('recid'), e, entry)
+            else:
+                loaded.append(_record_id(record))
+                if ledger:
+                    LoadLedger.mark(status=LoadStatus.SUCCEEDED,
+                                    record_id=loaded[-1], commit=False,
+                                    **ledger[idx])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        recids = [_dump_item_name(item) for item in data]
+        logger.exception('Failed to import records {0}.'.format(recids))
+        for entry in ledger or []:
+            LoadLedger.mark(status=LoadStatus.FAILED, error=str(e),
+                            commit=False, **entry)
+        db.session.commit()
+        return recids
+    finally:
+        db.session.info.pop(SINGLE_TRANSACTION, None)
+    _post_process(loaded)
+    return failed
+
+
+def _import_records_at_once(data, source_type=None, latest_only=False,
+                            ledger=None):
+    """Load a batch of record dumps with a single call of the loader."""
+    try:
+        data = [resolve_dump_ref(item) for item in data]
+        dumps = [
+            _record_dump(item, source_type=source_type,
+                         latest_only=latest_only)
+            for item in data
+        ]
+        loaded = [_record_id(r) for r in
+                  current_migrator.records_dumploader_cls.create_all(dumps)]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        recids = [_dump_item_name(item) for item in data]
+        logger.exception('Failed to import records {0}.'.format(recids))
+        for entry in ledger or []:
+            LoadLedger.mark(status=LoadStatus.FAILED, error=str(e),
+                            commit=False, **entry)
+        db.session.commit()
+        return recids
+    for entry, record_id in zip(ledger or [], loaded):
+        LoadLedger.mark(status=LoadStatus.SUCCEEDED, record_id=record_id,
+                        commit=False, **entry)
+    db.session.commit()
+    _post_process(loaded)
+    return []
+
+
+@shared_task()
+def index_records(record_ids):
+    """Send records to the bulk indexing queue.
+
+    Meant to be used as ``MIGRATOR_RECORDS_BULK_POST_TASK``. The records are
+    only queued, and are indexed in bulk by ``invenio index run``.
+
+    :param record_ids: List of record UUIDs.
+    """
+    from invenio_indexer.api import RecordIndexer
+    RecordIndexer().bulk_index(record_ids)
+
+
+@shared_task()
+def validate_records(record_ids):
+    """Validate a batch of records against their JSON schemas.
+
+    Meant to run after a migration with ``MIGRATOR_RECORDS_DEFER_HOOKS``
+    enabled, in which records are not validated when they are stored.
+
+    :param record_ids: List of record UUIDs.
+    :returns: List of ``(record_id, error)`` of the invalid records.
+    """
+    invalid = []
+    records = RecordMetadata.query.filter(
+        RecordMetadata.id.in_(record_ids))
+    for record in records:
+        if record.json is None:
+            continue
+        try:
+            validate_record(record.json)
+        except ValidationError as e:
+            logger.error('Invalid record {0}: {1}'.format(
+                record.id, e.message))
+            invalid.append((str(record.id), e.message))
+    return invalid
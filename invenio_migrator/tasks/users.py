@@ -34,9 +34,11 @@ from flask import current_app
 from invenio_db import db
 
 from .errors import UserEmailExistsError, UserUsernameExistsError
+from .utils import with_ledger
 
 
 @shared_task()
+@with_ledger
 def load_user(data):
     """Load user from data dump.
 
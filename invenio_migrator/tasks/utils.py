@@ -26,9 +26,13 @@
 
 from __future__ import absolute_import, print_function
 
+from functools import wraps
+
 from dateutil.parser import parse as iso2dt
 from invenio_db import db
 
+from ..models import LoadLedger, LoadStatus
+
 
 def load_common(model_cls, data):
     """Helper function for loading JSON data verbatim into model."""
@@ -37,6 +41,30 @@ def load_common(model_cls, data):
     db.session.commit()
 
 
+def with_ledger(f):
+    """Record the outcome of a load task in the load ledger.
+
+    The decorated task accepts an additional ``ledger`` keyword argument,
+    a dictionary with the ``dump``, ``index`` and ``item_id`` of the loaded
+    item. When given, the item is marked as succeeded or failed once the task
+    has finished. The task result and exceptions are left untouched.
+    """
+    @wraps(f)
+    def inner(*args, **kwargs):
+        ledger = kwargs.pop('ledger', None)
+        if ledger is None:
+            return f(*args, **kwargs)
+        try:
+            result = f(*args, **kwargs)
+        except Exception as e:
+            db.session.rollback()
+            LoadLedger.mark(status=LoadStatus.FAILED, error=str(e), **ledger)
+            raise
+        LoadLedger.mark(status=LoadStatus.SUCCEEDED, **ledger)
+        return result
+    return inner
+
+
 def iso2dt_or_none(iso_dt):
     """Turn ISO-formatted date into datetime (None if 'iso_dt' is empty).
 
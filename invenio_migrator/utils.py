@@ -25,26 +25,89 @@
 """Utility methods and classes to ease the migration process."""
 
 
+import threading
+import uuid
+from datetime import datetime
 from functools import wraps
 
+from flask import current_app
+from invenio_db import db
+from invenio_files_rest.errors import BucketLockedError
+from invenio_files_rest.models import FileInstance, ObjectVersion
+from invenio_pidstore.models import PersistentIdentifier
+from invenio_records.api import _records_state
 from invenio_records.models import Timestamp, timestamp_before_update
+from jsonschema.validators import Draft4Validator, validator_for
+from sqlalchemy import text
 from sqlalchemy.event import contains, listen, remove
+from sqlalchemy.orm import object_session
+from sqlalchemy_continuum import Operation
+
+from .proxies import current_migrator
+
+_TIMESTAMPS_KEY = 'invenio-migrator.suppress-timestamps'
+"""Session info key counting the timestamp suppressions of a session."""
+
+_timestamps = dict(suppressed=False)
+_timestamps_lock = threading.Lock()
+
+
+def _timestamp_before_update(mapper, connection, target):
+    """Update the ``updated`` date, unless timestamps are suppressed."""
+    if _timestamps['suppressed']:
+        return
+    session = object_session(target)
+    if session is not None and session.info.get(_TIMESTAMPS_KEY):
+        return
+    timestamp_before_update(mapper, connection, target)
+
+
+def _install_timestamp_listener():
+    """Replace the timestamp listener of Invenio-Records once.
+
+    The replacement behaves the same, but can be suppressed for the process
+    or for a session without modifying the event registry again.
+    """
+    with _timestamps_lock:
+        if contains(Timestamp, 'before_update', timestamp_before_update):
+            remove(Timestamp, 'before_update', timestamp_before_update)
+            listen(Timestamp, 'before_update', _timestamp_before_update,
+                   propagate=True)
+
+
+def suppress_timestamps(session=None):
+    """Suppress the automatic update of the ``updated`` date of records.
+
+    The dates set explicitly (e.g. from the dump) are stored as they are.
+    This is meant to be called once when a migration worker starts (see
+    ``MIGRATOR_SUPPRESS_TIMESTAMPS``).
+
+    :param session: Session for which timestamps are suppressed. By default,
+        they are suppressed for the whole process.
+    """
+    _install_timestamp_listener()
+    if session is None:
+        _timestamps['suppressed'] = True
+    else:
+        session.info[_TIMESTAMPS_KEY] = \
+            session.info.get(_TIMESTAMPS_KEY, 0) + 1
 
 
 class correct_date(object):
-    """Temporarily disable Timestamp date update."""
+    """Temporarily disable Timestamp date update.
+
+    The update is only disabled for the session of the current thread, so
+    that other threads of the process are not affected.
+    """
 
     def __enter__(self):
         """Disable date update."""
-        self._found = contains(
-            Timestamp, 'before_update', timestamp_before_update)
-        if self._found:
-            remove(Timestamp, 'before_update', timestamp_before_update)
+        self._session = db.session()
+        suppress_timestamps(self._session)
 
     def __exit__(self, type, value, traceback):
         """Re-enable date update."""
-        if self._found:
-            listen(Timestamp, 'before_update', timestamp_before_update)
+        self._session.info[_TIMESTAMPS_KEY] -= 1
 
 
 def disable_timestamp(method):
@@ -56,3 +119,243 @@ def disable_timestamp(method):
             result = method(*args, **kwargs)
         return result
     return wrapper
+
+
+def record_validator(schema):
+    """Get the validator of a JSON schema.
+
+    The validator (and the schemas it references) is only built once per
+    schema URL and application, instead of for each validated record.
+
+    :param schema: URL of the schema.
+    :returns: A :class:`jsonschema.IValidator` instance.
+    """
+    validators = current_migrator.records_validators
+    if schema not in validators:
+        schema_ref = {'$ref': schema}
+        validators[schema] = validator_for(
+            schema_ref, default=Draft4Validator
+        )(
+            schema_ref,
+            resolver=_records_state.ref_resolver_cls.from_schema(schema_ref),
+            types=current_app.config.get('RECORDS_VALIDATION_TYPES', {}),
+        )
+    return validators[schema]
+
+
+def validate_record(data):
+    """Validate a record according to the schema of its ``$schema`` key.
+
+    Equivalent to :meth:`invenio_records.api.Record.validate`, but with a
+    cached validator for each schema.
+
+    :param data: Record metadata.
+    :raises jsonschema.exceptions.ValidationError: If the record is invalid.
+    """
+    schema = data.get('$schema')
+    if schema is None:
+        return
+    if isinstance(schema, dict):
+        _records_state.validate(data, schema)
+    else:
+        record_validator(schema).validate(data)
+
+
+def versioning_manager():
+    """Get the SQLAlchemy-Continuum versioning manager (if enabled)."""
+    return getattr(
+        current_app.extensions['invenio-db'], 'versioning_manager', None)
+
+
+def new_version(session):
+    """Start a new record version without committing the transaction.
+
+    SQLAlchemy-Continuum creates a single version of each object per
+    transaction. Resetting its unit of work after a flush makes the next flush
+    create a new version, so that several revisions of a record can be stored
+    within one database transaction.
+
+    The unit of work is reset directly, as ``VersioningManager.clear`` does,
+    because the manager leaves it untouched within a savepoint (e.g. when a
+    batch of records is loaded in a single transaction).
+    """
+    manager = versioning_manager()
+    if manager is None:
+        return
+    conn = manager.session_connection_map.pop(session, None)
+    uow = manager.units_of_work.pop(conn, None)
+    if uow is not None:
+        uow.reset(session)
+
+
+def create_transactions(count, insert_rows=None):
+    """Create versioning transactions with bulk inserts.
+
+    :param count: Number of transactions.
+    :param insert_rows: Function inserting a list of rows in a table. By
+        default a multi-row insert is used.
+    :returns: List of the transaction identifiers.
+    """
+    table = versioning_manager().transaction_cls.__table__
+    now = datetime.utcnow()
+    if db.engine.dialect.name != 'postgresql':
+        # No way to allocate several identifiers at once.
+        return [
+            db.session.execute(
+                table.insert().values(issued_at=now)
+            ).inserted_primary_key[0]
+            for i in range(count)
+        ]
+    ids = [row[0] for row in db.session.execute(
+        text('SELECT nextval(:seq) FROM generate_series(1, :count)'),
+        dict(seq=table.c.id.default.name, count=count),
+    )]
+    rows = [dict(id=i, issued_at=now) for i in ids]
+    if insert_rows is None:
+        db.session.execute(table.insert(), rows)
+    else:
+        insert_rows(table, rows)
+    return ids
+
+
+def version_rows(record_id, created, revisions, transaction_ids,
+                 version_id=0):
+    """Build the version rows of the revisions of a record.
+
+    The rows are the ones SQLAlchemy-Continuum would store if each revision
+    was committed separately.
+
+    :param record_id: Identifier of the record.
+    :param created: Creation date of the record.
+    :param revisions: List of ``(updated, json)`` of each revision, from the
+        oldest to the newest.
+    :param transaction_ids: Transaction identifier of each revision.
+    :param version_id: Version of the record before the first revision, or
+        ``0`` if the first revision creates the record.
+    :returns: List of rows of the version table.
+    """
+    rows = []
+    for i, (updated, data) in enumerate(revisions):
+        rows.append(dict(
+            id=record_id,
+            json=data,
+            created=created.replace(tzinfo=None),
+            updated=updated.replace(tzinfo=None),
+            version_id=version_id + i + 1,
+            transaction_id=transaction_ids[i],
+            end_transaction_id=(
+                transaction_ids[i + 1] if i + 1 < len(revisions) else None),
+            operation_type=(
+                Operation.INSERT if version_id + i == 0
+                else Operation.UPDATE),
+        ))
+    return rows
+
+
+def existing_pids(pids, batch_size=500):
+    """Look up which persistent identifiers already exist.
+
+    Instead of getting each persistent identifier separately, the values are
+    looked up with one query per PID type (and per ``batch_size`` values).
+
+    :param pids: Iterable of ``(pid_type, pid_value)`` pairs.
+    :param batch_size: Maximum number of values looked up in a single query.
+    :returns: Set of the ``(pid_type, pid_value)`` pairs which exist.
+    """
+    values = {}
+    for pid_type, pid_value in pids:
+        values.setdefault(pid_type, set()).add(pid_value)
+
+    existing = set()
+    for pid_type, pid_values in values.items():
+        pid_values = sorted(pid_values)
+        for i in range(0, len(pid_values), batch_size):
+            q = db.session.query(PersistentIdentifier.pid_value).filter(
+                PersistentIdentifier.pid_type == pid_type,
+                PersistentIdentifier.pid_value.in_(
+                    pid_values[i:i + batch_size]),
+            )
+            existing.update((pid_type, v) for v, in q)
+    return existing
+
+
+def object_rows(bucket_id, objects):
+    """Build the file instance and object version rows of new objects.
+
+    :param bucket_id: Identifier of the bucket of the objects.
+    :param objects: List of dictionaries with the ``key``, ``uri``, ``size``,
+        ``checksum`` and optionally ``created`` of each object. Versions of
+        the same key must be ordered from the oldest to the newest, the last
+        one becoming the head version.
+    :returns: A tuple ``(file_rows, object_rows)``. The objects are extended
+        with the ``bucket_id``, ``version_id``, ``file_id`` and ``is_head`` of
+        each object.
+    """
+    now = datetime.utcnow()
+    storage_class = current_app.config['FILES_REST_DEFAULT_STORAGE_CLASS']
+    uri_max_len = current_app.config['FILES_REST_FILE_URI_MAX_LEN']
+    heads = dict((o['key'], i) for i, o in enumerate(objects))
+
+    file_rows, object_rows = [], []
+    for i, o in enumerate(objects):
+        if len(o['uri']) > uri_max_len:
+            raise ValueError(
+                'FileInstance URI too long ({0}).'.format(len(o['uri'])))
+        o.update(
+            bucket_id=bucket_id,
+            version_id=uuid.uuid4(),
+            file_id=uuid.uuid4(),
+            is_head=heads[o['key']] == i,
+        )
+        file_rows.append(dict(
+            id=o['file_id'],
+            uri=o['uri'],
+            size=o['size'],
+            checksum=o['checksum'],
+            readable=True,
+            writable=False,
+            storage_class=storage_class,
+            created=now,
+            updated=now,
+        ))
+        object_rows.append(dict(
+            bucket_id=o['bucket_id'],
+            key=o['key'],
+            version_id=o['version_id'],
+            file_id=o['file_id'],
+            is_head=o['is_head'],
+            created=o.get('created') or now,
+            updated=now,
+        ))
+    return file_rows, object_rows
+
+
+def bulk_create_objects(bucket, objects):
+    """Create file instances and object versions with bulk inserts.
+
+    This is equivalent to creating each object with
+    ``ObjectVersion.create(bucket, key).set_file(FileInstance(...))``, but
+    only issues a few statements, no matter how many objects are created.
+
+    :param bucket: Bucket in which the objects are created.
+    :param objects: List of objects (see :func:`object_rows`).
+    :returns: The list of objects, extended with the ``bucket_id``,
+        ``version_id``, ``file_id`` and ``is_head`` of each object.
+    """
+    if bucket.locked:
+        raise BucketLockedError()
+    if not objects:
+        return []
+
+    file_rows, obj_rows = object_rows(bucket.id, objects)
+
+    # Previous head versions of the keys are replaced by the new ones.
+    ObjectVersion.query.filter(
+        ObjectVersion.bucket_id == bucket.id,
+        ObjectVersion.key.in_(list(set(o['key'] for o in objects))),
+        ObjectVersion.is_head.is_(True),
+    ).update({ObjectVersion.is_head: False}, synchronize_session='fetch')
+    db.session.execute(FileInstance.__table__.insert(), file_rows)
+    db.session.execute(ObjectVersion.__table__.insert(), obj_rows)
+    bucket.size += sum(o['size'] for o in objects)
+    return objects
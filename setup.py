@@ -73,6 +73,9 @@ extras_require = {
         'urllib3<1.25,>=1.21.1',  # from "requests"
         'idna>=2.5,<2.8',  # from "requests"
     ],
+    'indexer': [
+        'invenio-indexer>=1.0.0',
+    ],
     'deposit': [
         'invenio-deposit>=1.0.0a6',
     ],
@@ -135,6 +138,12 @@ setup(
         'invenio_base.apps': [
             'invenio_migrator = invenio_migrator.ext:InvenioMigrator',
         ],
+        'invenio_db.alembic': [
+            'invenio_migrator = invenio_migrator:alembic',
+        ],
+        'invenio_db.models': [
+            'invenio_migrator = invenio_migrator.models',
+        ],
         'invenio_celery.tasks': [
             'communities = invenio_migrator.tasks.communities',
             'deposit = invenio_migrator.tasks.deposit',
@@ -29,7 +29,8 @@ from click.testing import CliRunner
 from invenio_migrator.legacy.cli import dump as dump_cli
 from invenio_migrator.legacy.records import (
     dump as dump_record,
-    get as get_record
+    get as get_record,
+    prefetch as prefetch_records
 )
 
 
@@ -77,12 +78,26 @@ def test_dump_record():
     assert len(record_dump['record'][0]['json']['authors']) == 315
 
 
+def test_prefetch_record():
+    """Test that prefetching revisions does not change the dump."""
+    record_dump = dump_record(10, '1970-01-01 00:00:00', with_json=False)
+
+    prefetch_records([10, 11], '1970-01-01 00:00:00')
+    assert dump_record(
+        10, '1970-01-01 00:00:00', with_json=False) == record_dump
+
+    prefetch_records([10, 11], '1970-01-01 00:00:00', latest_only=True)
+    record_dump_latest = dump_record(
+        10, '1970-01-01 00:00:00', with_json=False, latest_only=True)
+    assert record_dump_latest['record'] == record_dump['record'][-1:]
+
+
 def test_get_record():
     """Test get record."""
     records = get_record('Ellis', '1970-01-01 00:00:00')
     assert records[0] == 13
-    assert records[1] == set(
-        [8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 118, 47])
+    assert list(records[1]) == [
+        8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 47, 118]
 
 
 def test_cli():
@@ -93,3 +108,13 @@ def test_cli():
         result = runner.invoke(
             dump_cli, ['records', '-q', 'Ellis', '--with-json'])
         assert result.exit_code == 0
+
+        result = runner.invoke(
+            dump_cli, ['records', '-q', 'Ellis', '--chunk-size', '5',
+                       '--jobs', '2'])
+        assert result.exit_code == 0
+
+        result = runner.invoke(
+            dump_cli, ['records', '-q', 'Ellis', '--chunk-size', '5',
+                       '--resume'])
+        assert result.exit_code == 0
@@ -26,11 +26,17 @@
 
 from __future__ import absolute_import, print_function
 
-from os.path import join
+import json
+import shutil
+from os.path import abspath, join
 
 from click.testing import CliRunner
+from invenio_pidstore.models import PersistentIdentifier
+from invenio_records.models import RecordMetadata
 
-from invenio_migrator.cli import inspectrecords, loadrecords
+from invenio_migrator.cli import index, inspectrecords, loadrecords, \
+    postprocess, transformrecords, validaterecords
+from invenio_migrator.models import LoadLedger, LoadStatus
 
 
 def test_inspectrecords(script_info, datadir):
@@ -67,6 +73,28 @@ def test_inspectrecords(script_info, datadir):
     assert result.exit_code == 0
 
 
+def test_index(db, dummy_location, script_info, datadir, tmpdir):
+    """Test index CLI."""
+    runner = CliRunner()
+    filepath = tmpdir.join('records.json').strpath
+    shutil.copy(join(datadir, 'records.json'), filepath)
+
+    result = runner.invoke(index, [filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert '3 items indexed.' in result.output
+
+    result = runner.invoke(
+        inspectrecords, ['--recid', '11783', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert '"recid": 11783' in result.output
+
+    result = runner.invoke(
+        loadrecords, ['--recid', '11783', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert "Record '11783' loaded." in result.output
+    assert RecordMetadata.query.count() == 1
+
+
 def test_loadrecords(db, dummy_location, script_info, datadir):
     """Test load records CLI."""
     runner = CliRunner()
@@ -74,3 +102,129 @@ def test_loadrecords(db, dummy_location, script_info, datadir):
 
     result = runner.invoke(loadrecords, [filepath], obj=script_info)
     assert result.exit_code == 0
+
+
+def test_loadrecords_batch(db, dummy_location, script_info, datadir):
+    """Test load records CLI in batches."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+
+    result = runner.invoke(
+        loadrecords, ['--batch-size', '2', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert RecordMetadata.query.count() == 3
+    # The version history is the same as when loading the records one by
+    # one.
+    record = RecordMetadata.query.get(PersistentIdentifier.get(
+        'recid', '11783').object_uuid)
+    assert record.versions.count() == 3
+
+
+def test_loadrecords_batch_post_task(app, db, dummy_location, script_info,
+                                     datadir, monkeypatch):
+    """Test that the per-record post task is not chained to batches."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+    monkeypatch.setitem(app.extensions['invenio-migrator'].__dict__,
+                        'records_post_task', lambda record_id: None)
+
+    result = runner.invoke(
+        loadrecords, ['--batch-size', '2', filepath], obj=script_info)
+    assert result.exit_code == 2
+    assert RecordMetadata.query.count() == 0
+
+
+def test_loadrecords_by_reference(db, dummy_location, script_info, datadir):
+    """Test load records CLI sending references to the records."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+
+    result = runner.invoke(
+        loadrecords, ['--by-reference', '-b', '2', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert RecordMetadata.query.count() == 3
+
+
+def test_transformrecords(db, dummy_location, script_info, datadir, tmpdir):
+    """Test transform records CLI."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+    for jobs in ('1', '2'):
+        output_dir = tmpdir.join(jobs).strpath
+        result = runner.invoke(
+            transformrecords, ['-o', output_dir, '-j', jobs, filepath],
+            obj=script_info)
+        assert result.exit_code == 0
+
+        with open(join(output_dir, 'records.json')) as fp:
+            records = json.load(fp)
+        assert [r['recid'] for r in records] == [11782, 10, 11783]
+        assert all(rev['json']['title_statement']
+                   for r in records for rev in r['record'])
+
+    result = runner.invoke(
+        loadrecords, ['-t', 'json', join(output_dir, 'records.json')],
+        obj=script_info)
+    assert result.exit_code == 0
+    assert RecordMetadata.query.count() == 3
+
+
+def test_loadrecords_resume(db, dummy_location, script_info, datadir):
+    """Test load records CLI with the load ledger."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+
+    result = runner.invoke(
+        loadrecords, ['--ledger', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert LoadLedger.succeeded(abspath(filepath)) == {
+        0: '11782', 1: '10', 2: '11783'}
+
+    # Mark a record as failed, only this one is loaded again.
+    LoadLedger.mark(abspath(filepath), 1, LoadStatus.FAILED, item_id=10)
+    result = runner.invoke(
+        loadrecords, ['--resume', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert 'Skipped 2 items already loaded.' in result.output
+    assert LoadLedger.query.filter_by(
+        status=LoadStatus.SUCCEEDED).count() == 3
+    assert RecordMetadata.query.count() == 3
+
+
+def test_validaterecords(db, dummy_location, script_info, datadir):
+    """Test validate records CLI."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+    result = runner.invoke(
+        loadrecords, ['-t', 'json', filepath], obj=script_info)
+    assert result.exit_code == 0
+
+    result = runner.invoke(
+        validaterecords, ['--eager', '-b', '1'], obj=script_info)
+    assert result.exit_code == 0
+    assert '0 invalid records found.' in result.output
+
+
+def test_postprocess(app, db, dummy_location, script_info, datadir,
+                     monkeypatch):
+    """Test bulk post-processing of the loaded records."""
+    runner = CliRunner()
+    filepath = join(datadir, 'records.json')
+    batches = []
+    monkeypatch.setitem(app.extensions['invenio-migrator'].__dict__,
+                        'records_bulk_post_task', batches.append)
+
+    result = runner.invoke(
+        loadrecords, ['--ledger', '-b', '2', filepath], obj=script_info)
+    assert result.exit_code == 0
+    # The records of each batch are post-processed together.
+    assert [len(b) for b in batches] == [2, 1]
+    record_ids = set(str(r.id) for r in RecordMetadata.query)
+    assert set(sum(batches, [])) == record_ids
+
+    del batches[:]
+    result = runner.invoke(
+        postprocess, ['-b', '2', filepath], obj=script_info)
+    assert result.exit_code == 0
+    assert '3 records post-processed.' in result.output
+    assert set(sum(batches, [])) == record_ids
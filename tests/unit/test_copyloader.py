@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Copy loader tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+import pytest
+from invenio_files_rest.models import BucketTag, ObjectVersion
+from invenio_pidstore.models import PersistentIdentifier, PIDStatus, \
+    RecordIdentifier
+from invenio_records.api import Record
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+
+from invenio_migrator.copyloader import RecordDumpCopyLoader
+
+
+def test_create_all(app, db, dummy_location, record_dumps, record_dump,
+                    resolver):
+    """Test creation of records with bulk inserts."""
+    record_dump.data['record'][0]['json']['collections'] = ['deleted']
+    record_dump.prepare_revisions()
+    RecordDumpCopyLoader.create_all([record_dumps, record_dump])
+    db.session.commit()
+
+    pid, record = resolver.resolve('11783')
+    created = datetime(2011, 10, 13, 8, 27, 47)
+    assert record['title']
+    assert record.created == created
+    assert len(record.revisions) == 3
+    assert record.revisions[2].updated == datetime(2012, 10, 13, 8, 27, 47)
+    assert record.revisions[0].created == created
+    assert record.revisions[0].updated == created
+
+    pytest.raises(IntegrityError, RecordIdentifier.insert, 11783)
+    assert PersistentIdentifier.get('doi', '10.5281/zenodo.11783')
+
+    assert len(record['_files']) == 1
+    f = record['_files'][0]
+    obj = ObjectVersion.get(f['bucket'], f['key'])
+    assert obj.file.checksum == f['checksum']
+    assert BucketTag.get_value(f['bucket'], 'record') == str(record.id)
+
+    # The deleted record only keeps its persistent identifiers.
+    pid = PersistentIdentifier.get('doi', '10.5281/zenodo.11782')
+    assert pid.status == PIDStatus.DELETED
+    pytest.raises(NoResultFound, Record.get_record, pid.object_uuid)
@@ -106,6 +106,7 @@ def test_deposit_load_task(dummy_location, deposit_dump, deposit_user,
     files = list(dep_recbucket.files)
     assert files[0]['key'] == 'bazbar.pdf'
     assert files[0]['size'] == 12345
+    assert dep_recbucket.files.bucket.size == 12345
     assert files[0]['checksum'] == "md5:00000000000000000000000000000000"
     assert files[0]['bucket']
     assert SIPFile.query.count() == 1
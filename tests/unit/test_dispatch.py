@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Dispatch tests."""
+
+from __future__ import absolute_import, print_function
+
+from invenio_migrator.dispatch import DispatchWindow
+
+
+class Result(object):
+    """Result of a task completing after a number of polls."""
+
+    backend = None
+    parent = None
+
+    def __init__(self, polls, failed=False):
+        """Initialize the result."""
+        self.polls = polls
+        self._failed = failed
+
+    def ready(self):
+        """Check if the task completed."""
+        self.polls -= 1
+        return self.polls < 0
+
+    def failed(self):
+        """Check if the task failed."""
+        return self._failed
+
+    def forget(self):
+        """Forget the result."""
+
+
+def test_dispatch_window():
+    """Test the bound of tasks in flight."""
+    window = DispatchWindow(size=2, poll_interval=0)
+    window.add(Result(3))
+    assert len(window.pending) == 1
+    window.add(Result(0, failed=True))
+    # The window was full until the first task completed.
+    assert not window.pending
+    assert window.completed == 2
+    assert window.failed == 1
+
+    window.add(Result(5))
+    assert len(window.pending) == 1
+    window.join()
+    assert not window.pending
+    assert window.dispatched == window.completed == 3
+
+
+def test_dispatch_window_poll():
+    """Test that the tasks are checked up to the first one in flight."""
+    window = DispatchWindow(size=3)
+    first, second = Result(1), Result(0)
+    window.add(first)
+    window.add(second)
+    assert window.poll() == 0
+    assert second.polls == 0
+    assert window.poll() == 2
+
+
+def test_dispatch_window_chain():
+    """Test that the first task of a chain is tracked."""
+    window = DispatchWindow(size=1, poll_interval=0)
+    # The rest of the chain never completes when its first task fails.
+    result = Result(10)
+    result.parent = Result(0, failed=True)
+    window.add(result)
+    assert not window.pending
+    assert window.failed == 1
+
+
+def test_dispatch_window_unbounded():
+    """Test dispatch without bound."""
+    window = DispatchWindow()
+    for i in range(10):
+        window.add(Result(10))
+    assert not window.pending
+    assert window.dispatched == 10
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Dump reader tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+import shutil
+from os.path import exists, join
+
+import pytest
+from six import BytesIO
+
+from invenio_migrator import reader
+from invenio_migrator.reader import MappedDump, dump_ref, dump_size, \
+    find_item, index_path, iter_dump, iter_dump_items, mapped_dump, \
+    read_index, resolve_dump_ref, scan_dump, write_index
+
+
+def test_iter_dump(datadir):
+    """Test streaming of a dump file."""
+    with open(join(datadir, 'records.json'), 'rb') as fp:
+        raw = fp.read()
+        fp.seek(0)
+        assert dump_size(fp) == len(raw)
+        items = list(iter_dump(fp, read_size=16))
+
+    assert [i for _, _, i in items] == json.loads(raw.decode('utf-8'))
+    for offset, length, item in items:
+        assert json.loads(raw[offset:offset + length].decode('utf-8')) == item
+
+
+def test_iter_dump_unicode():
+    """Test byte offsets of items with multi-byte characters."""
+    data = [{'title': u'été'}, {'title': u'€'}, 10, [1, 2]]
+    raw = u'[\n{0}\n]'.format(u','.join(
+        json.dumps(d, ensure_ascii=False) for d in data)).encode('utf-8')
+    for read_size in (1, 2, 3, 1024):
+        items = list(iter_dump(BytesIO(raw), read_size=read_size))
+        assert [i for _, _, i in items] == data
+        for offset, length, item in items:
+            assert json.loads(
+                raw[offset:offset + length].decode('utf-8')) == item
+
+
+def test_iter_dump_empty():
+    """Test empty dump."""
+    assert list(iter_dump_items(BytesIO(b'[\n]'))) == []
+
+
+def test_iter_dump_invalid():
+    """Test invalid dumps."""
+    for raw in (b'', b'{}', b'[{"a": 1}', b'[1 2]'):
+        with pytest.raises(ValueError):
+            list(iter_dump_items(BytesIO(raw)))
+
+
+def test_dump_ref(datadir):
+    """Test reading items from references."""
+    path = join(datadir, 'records.json')
+    with open(path, 'rb') as fp:
+        items = list(iter_dump(fp))
+    for offset, length, item in items:
+        assert resolve_dump_ref(dump_ref(path, offset, length)) == item
+        assert resolve_dump_ref(item) == item
+
+
+def test_index(datadir, tmpdir):
+    """Test reading single items through the offset index."""
+    path = tmpdir.join('records.json').strpath
+    shutil.copy(join(datadir, 'records.json'), path)
+
+    with open(path, 'rb') as fp:
+        assert find_item(fp, 11783, 'recid')['recid'] == 11783
+        fp.seek(0)
+        assert write_index(fp) == 3
+    assert exists(index_path(path))
+    assert read_index(path)['key'] == 'recid'
+
+    with open(path, 'rb') as fp:
+        assert find_item(fp, 11783, 'recid')['recid'] == 11783
+        assert find_item(fp, '10', 'recid')['recid'] == 10
+        assert find_item(fp, 12345, 'recid') is None
+
+    # The index of a modified dump is ignored.
+    with open(path, 'ab') as fp:
+        fp.write(b'\n')
+    assert read_index(path) is None
+    with open(path, 'rb') as fp:
+        assert find_item(fp, 11783, 'recid')['recid'] == 11783
+
+
+def test_scan_dump(datadir):
+    """Test finding the items of a dump without decoding them."""
+    with open(join(datadir, 'records.json'), 'rb') as fp:
+        raw = fp.read()
+        fp.seek(0)
+        expected = [(o, l) for o, l, _ in iter_dump(fp)]
+    assert list(scan_dump(raw)) == expected
+
+    data = [{'title': u'"[été]" \\ {'}, u'€,', 10, [1, [2]], {}]
+    raw = u'[\n{0}\n]'.format(u' ,\n'.join(
+        json.dumps(d, ensure_ascii=False) for d in data)).encode('utf-8')
+    items = list(scan_dump(raw))
+    assert [json.loads(raw[o:o + l].decode('utf-8')) for o, l in items] == \
+        data
+    assert list(scan_dump(b'[ ]')) == []
+    for raw in (b'', b'{}', b'[{"a": 1}', b'[,1]', b'["a]'):
+        with pytest.raises(ValueError):
+            list(scan_dump(raw))
+
+
+def test_mapped_dump(datadir, tmpdir):
+    """Test reading items from a memory-mapped dump."""
+    path = join(datadir, 'records.json')
+    with open(path, 'rb') as fp:
+        items = list(iter_dump(fp))
+
+    with MappedDump(path) as dump:
+        assert list(dump) == items
+        assert dump.offsets() == [(o, l) for o, l, _ in items]
+        assert dump.find(11783, 'recid')['recid'] == 11783
+        assert dump.find(1178, 'recid') is None
+    assert mapped_dump(path) is mapped_dump(path)
+
+    empty = tmpdir.join('empty.json')
+    empty.write('')
+    with MappedDump(empty.strpath) as dump:
+        with pytest.raises(ValueError):
+            list(dump)
+
+
+def test_mapped_dump_offsets(tmpdir):
+    """Test that the offsets of the index include all the items."""
+    path = tmpdir.join('records.json')
+    path.write('[{"recid": 1}, {"recid": 1}, {}, {"recid": 2}]')
+    with MappedDump(path.strpath) as dump:
+        expected = dump.offsets()
+    assert len(expected) == 4
+
+    with open(path.strpath, 'rb') as fp:
+        assert write_index(fp) == 3
+    with MappedDump(path.strpath) as dump:
+        assert dump.offsets() == expected
+
+
+def test_mapped_dump_lru(tmpdir, monkeypatch):
+    """Test that the least recently used memory maps are closed."""
+    monkeypatch.setattr(reader, 'MAPPED_DUMPS_SIZE', 2)
+    paths = []
+    for i in range(3):
+        path = tmpdir.join('records_{0}.json'.format(i))
+        path.write('[{"recid": %d}]' % i)
+        paths.append(path.strpath)
+
+    first = mapped_dump(paths[0])
+    mapped_dump(paths[1])
+    assert mapped_dump(paths[0]) is first
+    mapped_dump(paths[2])
+    # The second dump was used least recently.
+    assert paths[1] not in reader._mapped_dumps
+    assert mapped_dump(paths[0]) is first
+    assert len(reader._mapped_dumps) == 2
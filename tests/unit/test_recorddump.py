@@ -26,8 +26,11 @@
 
 from __future__ import absolute_import, print_function
 
+import re
+
 from invenio_pidstore.fetchers import FetchedPID
 
+from invenio_migrator.cache import ConversionCache
 from invenio_migrator.records import RecordDump
 
 
@@ -55,6 +58,51 @@ def test_prepare_data_marcxml(records_json):
     assert record['title_statement']['title']
 
 
+def test_prepare_data_marcxml_cache(records_json, tmpdir):
+    """Test prepare data from marcxml with a conversion cache."""
+    expected = RecordDump(records_json[2])
+    expected.prepare_revisions()
+
+    cache = ConversionCache(maxsize=1, directory=tmpdir.strpath)
+    d = RecordDump(records_json[2], conversion_cache=cache)
+    d.prepare_revisions()
+    assert d.revisions == expected.revisions
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    # Revisions which only differ by their 005 field share the conversion.
+    data = dict(records_json[2], record=[records_json[2]['record'][0]] * 2)
+    data['record'][1] = dict(
+        data['record'][1],
+        marcxml=data['record'][1]['marcxml'].replace(
+            '<controlfield tag="005">', '<controlfield tag="005">1'))
+    d = RecordDump(data, conversion_cache=cache)
+    d.prepare_revisions()
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert d.revisions[0][1] == expected.revisions[0][1]
+    assert d.revisions[1][1]['date_and_time_of_latest_transaction'] != \
+        d.revisions[0][1]['date_and_time_of_latest_transaction']
+
+    # A cached conversion of a revision without 005 has no 005 either.
+    marcxml = re.sub(r'<controlfield tag="005">[^<]*</controlfield>', '',
+                     records_json[2]['record'][0]['marcxml'])
+    data = dict(records_json[2], record=[
+        dict(records_json[2]['record'][0], marcxml=marcxml)] * 2)
+    expected = RecordDump(data)
+    expected.prepare_revisions()
+    assert 'date_and_time_of_latest_transaction' not in \
+        expected.revisions[0][1]
+    d = RecordDump(data, conversion_cache=cache)
+    d.prepare_revisions()
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert d.revisions == expected.revisions
+
+    # Conversions are kept on disk across workers.
+    cache = ConversionCache(maxsize=1, directory=tmpdir.strpath)
+    d = RecordDump(records_json[2], conversion_cache=cache)
+    d.prepare_revisions()
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
 def test_prepare_data_json(records_json):
     """Test prepare data from json."""
     d = RecordDump(records_json[0], source_type='json')
@@ -133,6 +181,61 @@ def test_missing_pids(app, db, records_json, record_db):
     assert len(d.missing_pids) == 1
 
 
+def test_resolve_pids(app, db, records_json, record_pid):
+    """Test bulk lookup of the persistent identifiers of several dumps."""
+    dumps = [
+        RecordDump(r, source_type='json', pid_fetchers=[doi_fetcher])
+        for r in (records_json[0], records_json[2])
+    ]
+    for d in dumps:
+        d.prepare_revisions()
+        d.prepare_pids()
+    RecordDump.resolve_pids(dumps)
+    assert dumps[0].existing_pids == {('doi', '10.5281/zenodo.11782')}
+    assert len(dumps[0].missing_pids) == 0
+    assert len(dumps[1].missing_pids) == 1
+
+
+def test_skip_identical_revisions(records_json):
+    """Test collapsing of identical consecutive revisions."""
+    data = dict(records_json[0])
+    revision = data['record'][0]
+    data['record'] = [
+        dict(revision, modification_datetime='2014-01-01T00:00:00'),
+        dict(revision, modification_datetime='2014-01-02T00:00:00'),
+        dict(revision, modification_datetime='2014-01-03T00:00:00',
+             json=dict(revision['json'], title='Changed')),
+        dict(revision, modification_datetime='2014-01-04T00:00:00',
+             json=dict(revision['json'], title='Changed')),
+    ]
+    d = RecordDump(data, source_type='json')
+    d.prepare_revisions()
+    d.skip_identical_revisions()
+    assert [dt.day for dt, _ in d.revisions] == [2, 4]
+    assert d.revisions[1][1]['title'] == 'Changed'
+    assert d.created.day == 1
+
+
+def test_skip_identical_revisions_marcxml(records_json):
+    """Test collapsing of MARCXML revisions which only differ by 005."""
+    data = dict(records_json[2])
+    revision = data['record'][0]
+    marcxml = revision['marcxml']
+    data['record'] = [
+        dict(revision, modification_datetime='2014-01-01T00:00:00'),
+        dict(revision, modification_datetime='2014-01-02T00:00:00',
+             marcxml=marcxml.replace(
+                 '<controlfield tag="005">', '<controlfield tag="005">1')),
+    ]
+    for cache in (None, ConversionCache()):
+        d = RecordDump(data, conversion_cache=cache)
+        d.prepare_revisions()
+        d.skip_identical_revisions()
+        assert [dt.day for dt, _ in d.revisions] == [2]
+        assert d.revisions[0][1]['date_and_time_of_latest_transaction'] \
+            .startswith('1')
+
+
 def test_is_deleted(records_json):
     """Test get files."""
     d = RecordDump(records_json[0])
@@ -34,10 +34,11 @@ from invenio_files_rest.models import Bucket, BucketTag, FileInstance, \
 from invenio_pidstore.models import PersistentIdentifier, PIDStatus, \
     RecordIdentifier
 from invenio_records.api import Record
+from invenio_records.signals import after_record_insert, after_record_update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 
-from invenio_migrator.records import RecordDumpLoader
+from invenio_migrator.records import RecordDump, RecordDumpLoader
 
 
 def test_new_record(app, db, dummy_location, record_dumps, resolver):
@@ -68,6 +69,7 @@ def test_new_record(app, db, dummy_location, record_dumps, resolver):
     obj = ObjectVersion.get(f['bucket'], f['key'])
     assert obj.file.checksum == f['checksum']
     assert obj.file.size == f['size']
+    assert obj.bucket.size == f['size']
 
     assert BucketTag.get_value(f['bucket'], 'record') == str(record.id)
 
@@ -126,3 +128,162 @@ def test_deleted_record(app, db, dummy_location, record_dump, resolver):
 
     bucket = Bucket.query.all()[0]
     assert bucket.deleted
+
+
+@pytest.mark.parametrize('with_files', [True, False])
+def test_deleted_record_fast_path(app, db, dummy_location, record_dump,
+                                  monkeypatch, with_files):
+    """Test creation of a deleted record without the intermediate states."""
+    monkeypatch.setitem(app.config, 'MIGRATOR_RECORDS_DELETED_FAST_PATH', True)
+    monkeypatch.setitem(
+        app.config, 'MIGRATOR_RECORDS_DELETED_FILES', with_files)
+    record_dump.data['record'][0]['json']['collections'] = ['deleted']
+
+    RecordDumpLoader.create(record_dump)
+
+    pid = PersistentIdentifier.get('recid', '11782')
+    assert pid.status == PIDStatus.DELETED
+    pid = PersistentIdentifier.get('doi', '10.5281/zenodo.11782')
+    assert pid.status == PIDStatus.DELETED
+
+    record = Record.get_record(pid.object_uuid, with_deleted=True)
+    assert record.model.json is None
+    pytest.raises(NoResultFound, Record.get_record, pid.object_uuid)
+
+    if with_files:
+        assert ObjectVersion.query.count() == 1
+        assert Bucket.query.one().deleted
+    else:
+        assert Bucket.query.count() == 0
+        assert ObjectVersion.query.count() == 0
+
+
+def test_new_record_single_transaction(app, db, dummy_location, record_dumps,
+                                       resolver, monkeypatch):
+    """Test creation of new record in a single transaction."""
+    monkeypatch.setitem(
+        app.config, 'MIGRATOR_RECORDS_SINGLE_TRANSACTION', True)
+    RecordDumpLoader.create(record_dumps)
+    db.session.commit()
+
+    pid, record = resolver.resolve('11783')
+    created = datetime(2011, 10, 13, 8, 27, 47)
+    assert record.created == created
+    # Each revision is still stored as a separate version.
+    assert len(record.revisions) == 3
+    assert record.revisions[0].updated == created
+    assert record.revisions[1].updated == datetime(2012, 10, 13, 8, 27, 47)
+
+    assert PersistentIdentifier.get('doi', '10.5281/zenodo.11783')
+    assert len(record['_files']) == 1
+    f = record['_files'][0]
+    assert ObjectVersion.get(f['bucket'], f['key'])
+
+
+def test_update_record_incremental(app, db, dummy_location, record_dumps,
+                                   resolver, monkeypatch):
+    """Test update of a record with only the new revisions."""
+    monkeypatch.setitem(
+        app.config, 'MIGRATOR_RECORDS_INCREMENTAL_UPDATE', True)
+    RecordDumpLoader.create(record_dumps)
+    pid, record = resolver.resolve('11783')
+    assert len(record.revisions) == 3
+    files = record['_files']
+    assert files
+
+    # Loading the same dump again does not store any new version.
+    data = record_dumps.data
+    RecordDumpLoader.create(RecordDump(data, source_type='json'))
+    pid, record = resolver.resolve('11783')
+    assert len(record.revisions) == 3
+    assert record['_files'] == files
+
+    # Only the revision newer than the stored record is applied.
+    revision = dict(data['record'][-1],
+                    modification_datetime='2013-10-13T08:27:47+00:00',
+                    json=dict(data['record'][-1]['json'], title='New'))
+    data = dict(data, record=data['record'] + [revision])
+    RecordDumpLoader.create(RecordDump(data, source_type='json'))
+    pid, record = resolver.resolve('11783')
+    # The files are stored again on top of the new revision.
+    assert len(record.revisions) == 5
+    assert record.revisions[3]['title'] == 'New'
+    assert record['title'] == 'New'
+    assert record['_files'] == files
+    assert record.updated == datetime(2013, 10, 13, 8, 27, 47)
+    assert record.created == datetime(2011, 10, 13, 8, 27, 47)
+
+
+def test_update_record_bulk_files(app, db, dummy_location, record_dump,
+                                  record_db, resolver, record_file,
+                                  monkeypatch):
+    """Test update of a record with bulk insertion of files."""
+    monkeypatch.setitem(app.config, 'MIGRATOR_FILES_BULK_INSERT', True)
+    record_db['_files'] = [record_file]
+    record_db.commit()
+    db.session.commit()
+
+    RecordDumpLoader.create(record_dump)
+    db.session.commit()
+    pid, record = resolver.resolve('11782')
+
+    assert Bucket.query.count() == 1
+    assert ObjectVersion.query.count() == 2
+    assert ObjectVersion.query.filter_by(is_head=True).count() == 1
+    assert FileInstance.query.count() == 2
+
+    assert len(record['_files']) == 1
+    f = record['_files'][0]
+    obj = ObjectVersion.get(f['bucket'], f['key'])
+    assert str(obj.version_id) == f['version_id']
+    assert obj.file.checksum == f['checksum']
+    assert obj.file.size == f['size']
+    assert obj.bucket.size == record_file['size'] + f['size']
+
+
+def test_new_record_bulk_versions(app, db, dummy_location, record_dumps,
+                                  resolver, monkeypatch):
+    """Test creation and update of a record with bulk inserted versions."""
+    monkeypatch.setitem(app.config, 'MIGRATOR_RECORDS_BULK_VERSIONS', True)
+    RecordDumpLoader.create(record_dumps)
+    pid, record = resolver.resolve('11783')
+    created = datetime(2011, 10, 13, 8, 27, 47)
+    assert record.created == created
+    assert len(record.revisions) == 3
+    assert [r.model.version_id for r in record.revisions] == [1, 2, 3]
+    assert record.revisions[0].updated == created
+    assert record.revisions[1].updated == datetime(2012, 10, 13, 8, 27, 47)
+    assert record.revisions[2].updated == datetime(2012, 10, 13, 8, 27, 47)
+    assert len(record['_files']) == 1
+
+    # Updating the record appends the new versions to its history (two
+    # revisions and the new files).
+    RecordDumpLoader.create(RecordDump(record_dumps.data, source_type='json'))
+    pid, record = resolver.resolve('11783')
+    assert record.model.version_id == 6
+    assert len(record.revisions) == 6
+    assert record.revisions[4].model.version_id == 5
+    assert record.created == created
+
+
+def test_new_record_defer_hooks(app, db, dummy_location, record_dumps,
+                                resolver, monkeypatch):
+    """Test creation of a record without record signals."""
+    monkeypatch.setitem(app.config, 'MIGRATOR_RECORDS_DEFER_HOOKS', True)
+    received = []
+
+    def receiver(sender, record=None):
+        received.append(record)
+
+    after_record_insert.connect(receiver)
+    after_record_update.connect(receiver)
+    try:
+        RecordDumpLoader.create(record_dumps)
+    finally:
+        after_record_insert.disconnect(receiver)
+        after_record_update.disconnect(receiver)
+
+    assert received == []
+    pid, record = resolver.resolve('11783')
+    assert len(record.revisions) == 3
+    assert len(record['_files']) == 1
@@ -26,10 +26,14 @@
 
 from __future__ import absolute_import, print_function
 
+import pytest
 from invenio_files_rest.models import ObjectVersion
 from invenio_records.models import RecordMetadata
 
-from invenio_migrator.tasks.records import import_record
+from invenio_migrator.models import LoadLedger, LoadStatus
+from invenio_migrator.reader import dump_ref
+from invenio_migrator.records import SINGLE_TRANSACTION
+from invenio_migrator.tasks.records import import_record, import_records
 
 
 def test_import_record(app, db, dummy_location, record_dump, records_json,
@@ -58,3 +62,55 @@ def test_import_record(app, db, dummy_location, record_dump, records_json,
         "ALEPH",
     ]
     assert len(record['_files']) == 2
+
+
+def test_import_records(app, db, dummy_location, records_json, resolver):
+    """Test import of a batch of records with a failing record."""
+    broken = dict(recid=99, files=[], record=[
+        dict(modification_datetime='invalid', marcxml='', json={})])
+
+    failed = import_records(
+        [records_json[0], broken, records_json[2]], source_type='json')
+    assert failed == [99]
+    # The failing record is rolled back to its savepoint only.
+    assert RecordMetadata.query.count() == 2
+    assert SINGLE_TRANSACTION not in db.session.info
+    # Each revision and the files are stored in their own version, as when
+    # the records are loaded one by one.
+    pid, record = resolver.resolve('11782')
+    assert len(record.revisions) == 2
+    pid, record = resolver.resolve('11783')
+    assert len(record.revisions) == 3
+
+    ref = dump_ref('/missing/records.json', 10, 20)
+    assert import_records([ref], source_type='json') == \
+        ['/missing/records.json@10']
+
+
+def test_import_record_missing_dump(app, db, tmpdir):
+    """Test that an unreadable dump reference fails in the load ledger."""
+    entry = dict(dump=str(tmpdir.join('missing.json')), index=0,
+                 item_id='11782')
+    ref = dump_ref(entry['dump'], 0, 10)
+
+    with pytest.raises(IOError):
+        import_record(ref, source_type='json', ledger=entry)
+    assert LoadLedger.query.one().status == LoadStatus.FAILED
+
+    assert import_records([ref], source_type='json') == \
+        ['{0}@0'.format(entry['dump'])]
+    assert RecordMetadata.query.count() == 0
+
+
+def test_import_record_post_process(app, db, dummy_location, records_json,
+                                    monkeypatch):
+    """Test that only batches are post-processed by the load tasks."""
+    batches = []
+    monkeypatch.setitem(app.extensions['invenio-migrator'].__dict__,
+                        'records_bulk_post_task', batches.append)
+
+    assert import_record(records_json[0], source_type='json') is None
+    assert batches == []
+
+    import_records(records_json[2:], source_type='json')
+    assert [len(b) for b in batches] == [1]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Utilities tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+import pytest
+from invenio_records.api import Record
+from jsonschema.exceptions import ValidationError
+
+from invenio_migrator.utils import correct_date, suppress_timestamps, \
+    validate_record
+
+
+def test_correct_date(app, db):
+    """Test timestamp suppression within a block."""
+    record = Record.create({'title': 'Test'})
+    db.session.commit()
+
+    updated = datetime(2000, 1, 1)
+    with correct_date():
+        record.model.json = {'title': 'Changed'}
+        record.model.updated = updated
+        db.session.commit()
+    assert record.model.updated == updated
+
+    record.model.json = {'title': 'Changed again'}
+    db.session.commit()
+    assert record.model.updated > updated
+
+
+def test_suppress_timestamps(app, db):
+    """Test timestamp suppression for a session."""
+    record = Record.create({'title': 'Test'})
+    db.session.commit()
+
+    suppress_timestamps(db.session())
+    updated = datetime(2000, 1, 1)
+    for title in ('Changed', 'Changed again'):
+        record.model.json = {'title': title}
+        record.model.updated = updated
+        db.session.commit()
+        assert record.model.updated == updated
+
+
+def test_validate_record(app):
+    """Test validation of a record against its schema."""
+    schema = {
+        'type': 'object',
+        'properties': {'title': {'type': 'string'}},
+    }
+    validate_record({'title': 'Test'})
+    validate_record({'$schema': schema, 'title': 'Test'})
+    pytest.raises(
+        ValidationError, validate_record, {'$schema': schema, 'title': 1})